@@ -1,6 +1,6 @@
 {
     'name': 'General',
-    'version': '1.2.0',
+    'version': '1.6.0',
     'category': 'General',
     'summary': 'Shared masterfiles for modules (Banks, KCode, Utility Accounts, Payment Attachments)',
     'description': """
@@ -11,6 +11,10 @@ This module provides shared masterfiles used across all modules:
 * KCode - General purpose codes for identification
 * Utility Accounts - Utility provider accounts (MERALCO, Water)
 * Payment Attachments - Reusable attachment model for receipts (bank slips, GCash, Maya, etc.)
+* Audit Log - Compact append-only audit trail for high-volume transaction models
+* Statements of Account - Cached SOA documents generated by queued background runs
+* Index Usage Check - EXPLAIN-based check that the hot searches use their declared indexes
+* Archiving - Hot/cold split of verified transactions older than a configurable horizon
     """,
     'depends': [
         'base',
@@ -20,10 +24,15 @@ This module provides shared masterfiles used across all modules:
     'data': [
         'security/security.xml',
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/bank_views.xml',
         'views/kcode_views.xml',
         'views/utility_account_views.xml',
         'views/payment_attachment_views.xml',
+        'views/audit_log_views.xml',
+        'views/soa_views.xml',
+        'views/index_check_views.xml',
+        'report/soa_report.xml',
     ],
     'demo': [
         'demo/general_demo.xml',
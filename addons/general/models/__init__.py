@@ -2,3 +2,14 @@ from . import bank
 from . import kcode
 from . import utility_account
 from . import payment_attachment
+from . import audit_log
+from . import audit_mixin
+from . import meter_reading_import
+from . import soa_document
+from . import soa_run
+from . import soa_mixin
+from . import utility_rate_mixin
+from . import meter_carry_forward_mixin
+from . import archive_mixin
+from . import index_mixin
+from . import index_check
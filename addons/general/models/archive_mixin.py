@@ -0,0 +1,96 @@
+from odoo import api, fields, models
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ArchiveMixin(models.AbstractModel):
+    """Hot/cold split of high-volume transaction models.
+
+    Verified records older than the archive horizon (system parameter
+    ``general.archive_horizon_days``, in days) are archived by
+    _archive_old_records(): their ``active`` flag is cleared with chunked
+    UPDATEs, without mail tracking or recomputation since nothing else
+    changes. Lists, searches and the list order index then only cover the
+    hot rows (declare a partial index ``WHERE active`` on the list order).
+
+    Archived rows stay in the same table, so foreign keys, attachments and
+    messages keep working and raw SQL reports read them unchanged. ORM reads
+    that must see the whole history (ledgers, totals, One2many fields) use
+    ``active_test=False``; the "Archived" search filter shows them in lists.
+    """
+    _name = 'kst.archive.mixin'
+    _description = 'Archive Mixin'
+
+    # Records older than the horizon on this date field can be archived
+    _archive_date_field = 'transaction_date'
+    # Rows archived per UPDATE (and per commit in cron)
+    _archive_chunk_size = 10000
+
+    active = fields.Boolean('Active', default=True,
+                            help="Unchecked when the verified record is older than the archive horizon "
+                                 "(hidden from lists by default, still part of ledgers and reports)")
+
+    def init(self):
+        super().init()
+        # The field default only applies to ORM creates: rows inserted with raw
+        # SQL must be active too
+        self.env.cr.execute("ALTER TABLE %s ALTER COLUMN active SET DEFAULT TRUE" % self._table)
+        self.env.cr.execute("UPDATE %s SET active = TRUE WHERE active IS NULL" % self._table)
+
+    @api.model
+    def _get_archive_cutoff(self):
+        """Date before which verified records are archived (None when archiving is disabled)"""
+        horizon_days = int(self.env['ir.config_parameter'].sudo().get_param('general.archive_horizon_days', 0) or 0)
+        if horizon_days <= 0:
+            return None
+        return fields.Date.today() - timedelta(days=horizon_days)
+
+    @api.model
+    def _archive_old_records(self, cutoff=None, commit=False):
+        """Archive the verified records dated before ``cutoff`` (default: the configured horizon).
+
+        With ``commit``, each chunk is committed (for long cron runs).
+        Returns the number of records archived.
+        """
+        cutoff = cutoff or self._get_archive_cutoff()
+        if not cutoff:
+            return 0
+        self.flush(['active', 'verification_status', self._archive_date_field])
+        archived = 0
+        while True:
+            self.env.cr.execute("""
+                UPDATE {table}
+                   SET active = FALSE,
+                       write_uid = %(uid)s,
+                       write_date = (now() at time zone 'UTC')
+                 WHERE id IN (
+                        SELECT id
+                          FROM {table}
+                         WHERE active
+                           AND verification_status = 'verified'
+                           AND {date_field} < %(cutoff)s
+                         LIMIT %(limit)s
+                           FOR UPDATE SKIP LOCKED
+                       )
+             RETURNING id
+            """.format(table=self._table, date_field=self._archive_date_field), {
+                'uid': self.env.uid,
+                'cutoff': cutoff,
+                'limit': self._archive_chunk_size,
+            })
+            ids = [row[0] for row in self.env.cr.fetchall()]
+            if not ids:
+                break
+            self.invalidate_cache(['active', 'write_uid', 'write_date'], ids)
+            archived += len(ids)
+            _logger.info("%s archiving: %s records archived (before %s)", self._description, archived, cutoff)
+            if commit:
+                self.env.cr.commit()
+        return archived
+
+    @api.model
+    def _cron_archive_old_records(self):
+        """Archive the verified records older than the configured horizon"""
+        return self._archive_old_records(commit=True)
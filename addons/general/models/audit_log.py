@@ -0,0 +1,91 @@
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+import json
+
+
+class AuditLog(models.Model):
+    """Append-only compact audit log.
+
+    One row per change set (one record, one create/write/unlink), with the
+    changed values stored as JSON. Used instead of mail tracking on
+    high-volume transaction models when compact audit mode is enabled
+    (see kst.audit.mixin).
+    """
+    _name = 'kst.audit.log'
+    _description = 'Audit Log'
+    _order = 'id desc'
+    _log_access = False
+
+    model = fields.Char('Model', required=True, readonly=True, index=True)
+    res_id = fields.Many2oneReference('Record ID', model_field='model', required=True,
+                                      readonly=True, index=True)
+    operation = fields.Selection([
+        ('create', 'Create'),
+        ('write', 'Update'),
+        ('unlink', 'Delete'),
+    ], string='Operation', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    date = fields.Datetime('Date', readonly=True)
+    changes = fields.Text('Changes', readonly=True,
+                          help="JSON object of changed fields: {field: value} on create/delete, "
+                               "{field: [old, new]} on update")
+    changes_display = fields.Text('Changed Values', compute='_compute_changes_display')
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS kst_audit_log_model_res_id_index
+                ON kst_audit_log (model, res_id)
+        """)
+
+    @api.depends('changes')
+    def _compute_changes_display(self):
+        for record in self:
+            try:
+                changes = json.loads(record.changes or '{}')
+            except ValueError:
+                record.changes_display = record.changes
+                continue
+            lines = []
+            for fname, value in changes.items():
+                if record.operation == 'write' and isinstance(value, list) and len(value) == 2:
+                    lines.append(f"{fname}: {value[0]} → {value[1]}")
+                else:
+                    lines.append(f"{fname}: {value}")
+            record.changes_display = '\n'.join(lines)
+
+    @api.model
+    def _log(self, model, operation, changes):
+        """Append audit rows in one INSERT.
+
+        ``changes`` is a list of (res_id, dict) pairs; empty dicts are skipped.
+        """
+        rows = [(res_id, json.dumps(values, default=str)) for res_id, values in changes if values]
+        if not rows:
+            return
+        self.env.cr.execute("""
+            INSERT INTO kst_audit_log (model, res_id, operation, user_id, date, changes)
+            SELECT %s, data.res_id, %s, %s, NOW() AT TIME ZONE 'UTC', data.changes
+              FROM unnest(%s::int[], %s::text[]) AS data(res_id, changes)
+        """, (model, operation, self.env.uid, [row[0] for row in rows], [row[1] for row in rows]))
+
+    def write(self, vals):
+        raise UserError("Audit log entries are append-only and cannot be modified.")
+
+    def unlink(self):
+        raise UserError("Audit log entries are append-only and cannot be deleted.")
+
+    def action_open_record(self):
+        """Open the audited record (if it still exists)"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+        }
+
+    def name_get(self):
+        result = []
+        for record in self:
+            result.append((record.id, f"{record.model},{record.res_id} - {record.operation}"))
+        return result
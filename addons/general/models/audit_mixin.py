@@ -0,0 +1,85 @@
+from odoo import api, models
+from odoo.tools import str2bool
+
+
+class AuditMixin(models.AbstractModel):
+    """Compact audit mode for high-volume transaction models.
+
+    When the ``general.compact_audit`` system parameter is enabled, mail
+    tracking (mail.message / mail.tracking.value rows per write) is disabled
+    on models inheriting this mixin, and every create/write/unlink appends one
+    kst.audit.log row per record with the changed tracked fields as JSON.
+
+    List this mixin before mail.thread in _inherit so it wraps mail tracking:
+        _inherit = ['kst.audit.mixin', 'mail.thread', 'mail.activity.mixin']
+    """
+    _name = 'kst.audit.mixin'
+    _description = 'Compact Audit Mixin'
+
+    @api.model
+    def _compact_audit_enabled(self):
+        if self._context.get('audit_disable'):
+            return False
+        return str2bool(self.env['ir.config_parameter'].sudo().get_param('general.compact_audit', 'False'))
+
+    @api.model
+    def _get_audit_fields(self):
+        """Fields audited in compact mode: the ones declared with tracking"""
+        return [name for name, field in self._fields.items()
+                if field.store and getattr(field, 'tracking', None)]
+
+    def _read_audit_values(self, fnames):
+        """Map record id to {field: value} (relational fields as ids) in one read"""
+        if not fnames:
+            return {res_id: {} for res_id in self.ids}
+        return {
+            row.pop('id'): row
+            for row in self.read(fnames, load=None)
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        if not self._compact_audit_enabled():
+            return super().create(vals_list)
+        records = super(AuditMixin, self.with_context(tracking_disable=True)).create(vals_list)
+        values = records._read_audit_values(self._get_audit_fields())
+        self.env['kst.audit.log']._log(self._name, 'create', [
+            (res_id, {fname: value for fname, value in vals.items() if value not in (False, None)})
+            for res_id, vals in values.items()
+        ])
+        return records.with_env(self.env)
+
+    def write(self, vals):
+        if not self._compact_audit_enabled():
+            return super().write(vals)
+        fnames = [fname for fname in self._get_audit_fields() if fname in vals]
+        before = self._read_audit_values(fnames) if fnames else {}
+        result = super(AuditMixin, self.with_context(tracking_disable=True)).write(vals)
+        if fnames:
+            after = self._read_audit_values(fnames)
+            self.env['kst.audit.log']._log(self._name, 'write', [
+                (res_id, {
+                    fname: [old[fname], after[res_id][fname]]
+                    for fname in fnames
+                    if old[fname] != after[res_id][fname]
+                })
+                for res_id, old in before.items()
+            ])
+        return result
+
+    def unlink(self):
+        if not self._compact_audit_enabled():
+            return super().unlink()
+        values = self._read_audit_values(self._get_audit_fields())
+        self.env['kst.audit.log']._log(self._name, 'unlink', list(values.items()))
+        return super(AuditMixin, self.with_context(tracking_disable=True)).unlink()
+
+    def action_view_audit_log(self):
+        """Action to view the compact audit log of these records"""
+        return {
+            'name': 'Audit Log',
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.audit.log',
+            'view_mode': 'tree,form',
+            'domain': [('model', '=', self._name), ('res_id', 'in', self.ids)],
+        }
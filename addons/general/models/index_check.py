@@ -0,0 +1,102 @@
+from odoo import api, fields, models
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class IndexCheck(models.TransientModel):
+    """EXPLAIN-based check of the declared indexes.
+
+    Each module registers the ORM searches of its hot paths (generation,
+    verification...) by extending _get_index_checks(). The check builds the
+    SQL of every search exactly as the ORM does, runs EXPLAIN on it and
+    reports whether the plan uses the expected index. Sequential scans are
+    disabled for the check, so that small development databases (where the
+    planner rightly prefers to scan) still show whether an index is usable.
+    """
+    _name = 'kst.index.check'
+    _description = 'Index Usage Check'
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], default='draft', required=True)
+    passed_count = fields.Integer('Passed', readonly=True)
+    failed_count = fields.Integer('Failed', readonly=True)
+    report = fields.Text('Report', readonly=True)
+
+    @api.model
+    def _get_index_checks(self):
+        """List of (label, model, domain, order, expected index name) to check.
+
+        Override to add the searches of a module; use ids that may not exist
+        (e.g. 0) as the planner only needs the shape of the query.
+        """
+        return []
+
+    @api.model
+    def _get_plan_indexes(self, plan):
+        """Names of the indexes used anywhere in a JSON EXPLAIN plan"""
+        names = set()
+        if isinstance(plan, dict):
+            if plan.get('Index Name'):
+                names.add(plan['Index Name'])
+            for value in plan.values():
+                names |= self._get_plan_indexes(value)
+        elif isinstance(plan, list):
+            for value in plan:
+                names |= self._get_plan_indexes(value)
+        return names
+
+    @api.model
+    def _explain(self, model, domain, order=None):
+        """Indexes used by the plan of ``model.search(domain, order=order)`` (as superuser, without record rules)"""
+        Model = self.env[model].sudo()
+        query = Model._search(domain, order=order)
+        query_str, params = query.select()
+        with self.env.cr.savepoint():
+            self.env.cr.execute("SET LOCAL enable_seqscan = off")
+            self.env.cr.execute("EXPLAIN (FORMAT JSON) " + query_str, params)
+            plan = self.env.cr.fetchone()[0]
+            # Releasing the savepoint keeps SET LOCAL until the end of the
+            # transaction (an error rolls it back with the savepoint)
+            self.env.cr.execute("RESET enable_seqscan")
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return self._get_plan_indexes(plan)
+
+    @api.model
+    def _run_checks(self):
+        """Run every registered check; returns [(label, expected index, used indexes, passed)]"""
+        results = []
+        for label, model, domain, order, index_name in self._get_index_checks():
+            used = self._explain(model, domain, order)
+            results.append((label, index_name, used, index_name in used))
+            if index_name not in used:
+                _logger.warning("Index check '%s': %s not used (plan uses %s)",
+                                label, index_name, ', '.join(sorted(used)) or 'no index')
+        return results
+
+    def action_run(self):
+        """Run the checks and show the report"""
+        self.ensure_one()
+        results = self._run_checks()
+        lines = [
+            f"{'OK  ' if passed else 'FAIL'} {label}: expects {index_name}"
+            + ('' if passed else f" (plan uses {', '.join(sorted(used)) or 'no index'})")
+            for label, index_name, used, passed in results
+        ]
+        self.write({
+            'state': 'done',
+            'passed_count': len([result for result in results if result[3]]),
+            'failed_count': len([result for result in results if not result[3]]),
+            'report': '\n'.join(lines) or "No index checks are registered.",
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -0,0 +1,37 @@
+from odoo import models
+
+
+class IndexMixin(models.AbstractModel):
+    """Declared composite and partial indexes.
+
+    Single-column indexes are declared with index=True on the field; indexes
+    over several columns or restricted to a subset of rows are listed in
+    _indexes and created by init() when missing:
+
+        _indexes = {
+            'batch_date': (['rent_batch_id', 'transaction_date'], None),
+            'pending_batch': (['rent_batch_id'], "verification_status = 'pending'"),
+        }
+
+    creates kst_market_rent_transaction_batch_date_index and
+    kst_market_rent_transaction_pending_batch_index. Use the kst.index.check
+    wizard to confirm that the queries of a module use them.
+    """
+    _name = 'kst.index.mixin'
+    _description = 'Index Mixin'
+
+    # name suffix -> (indexed columns or expressions, WHERE predicate of a partial index or None)
+    _indexes = {}
+
+    def _get_index_name(self, suffix):
+        return f"{self._table}_{suffix}_index"
+
+    def init(self):
+        super().init()
+        for suffix, (columns, where) in self._indexes.items():
+            self.env.cr.execute("CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}){where}".format(
+                name=self._get_index_name(suffix),
+                table=self._table,
+                columns=', '.join(columns),
+                where=f" WHERE {where}" if where else '',
+            ))
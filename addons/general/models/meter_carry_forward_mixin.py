@@ -0,0 +1,137 @@
+from odoo import models
+
+
+class MeterCarryForwardMixin(models.AbstractModel):
+    """Carry-forward of meter readings for utility bill models.
+
+    Fills the empty previous readings of the bills' transactions from the
+    latest earlier reading of the same meter (stall/unit and utility type)
+    in one statement, and reports the meters whose current reading went
+    down (rollover or reset) instead of writing them.
+
+    Inheriting models set _carry_transaction_model (the utility transaction
+    model, linked to the bill through utility_bill_id) and
+    _carry_subject_field (its stall/unit Many2one).
+    """
+    _name = 'kst.meter.carry.forward.mixin'
+    _description = 'Meter Reading Carry-Forward Mixin'
+
+    _carry_transaction_model = None
+    _carry_subject_field = None
+
+    # Fills the empty previous_reading of the transactions of %(bill_ids)s from
+    # the latest earlier current_reading of the same subject and utility type.
+    # reading_no numbers the readings of each meter in date order, so the
+    # reading to carry is the one numbered like the target row (minus one when
+    # the target row holds a reading itself). A current reading lower than the
+    # carried one is not written but reported: a rollover when the carried
+    # reading is in the top 10% of the meter's digit range and the new one in
+    # the bottom 10%, otherwise a reset (meter replaced).
+    # {table} and {subject} are the transaction table and subject column.
+    _carry_forward_query = """
+        WITH history AS (
+                SELECT t.id, t.utility_bill_id, t.{subject} AS subject_id, t.utility_type,
+                       t.previous_reading, t.current_reading,
+                       COUNT(NULLIF(t.current_reading, 0)) OVER (
+                           PARTITION BY t.{subject}, t.utility_type
+                           ORDER BY t.transaction_date, t.id
+                       ) AS reading_no
+                  FROM {table} t
+                 WHERE (t.{subject}, t.utility_type) IN (
+                        SELECT {subject}, utility_type
+                          FROM {table}
+                         WHERE utility_bill_id IN %(bill_ids)s)
+        ), carry AS (
+                SELECT target.id, target.utility_bill_id AS bill_id, target.subject_id, target.utility_type,
+                       target.current_reading, reading.current_reading AS carried_reading
+                  FROM history target
+                  JOIN history reading
+                    ON reading.subject_id = target.subject_id
+                   AND reading.utility_type = target.utility_type
+                   AND reading.current_reading > 0
+                   AND reading.reading_no = target.reading_no
+                                            - CASE WHEN target.current_reading > 0 THEN 1 ELSE 0 END
+                 WHERE target.utility_bill_id IN %(bill_ids)s
+                   AND COALESCE(target.previous_reading, 0) = 0
+        ), checked AS (
+                SELECT carry.*,
+                       CASE WHEN current_reading > 0 AND current_reading < carried_reading THEN
+                            CASE WHEN carried_reading >= 0.9 * meter.capacity
+                                      AND current_reading < 0.1 * meter.capacity
+                                 THEN 'rollover' ELSE 'reset'
+                            END
+                       END AS anomaly
+                  FROM carry
+                 CROSS JOIN LATERAL (
+                        SELECT POWER(10, FLOOR(LOG(carried_reading)) + 1) AS capacity
+                       ) meter
+        ), updated AS (
+                UPDATE {table} t
+                   SET previous_reading = c.carried_reading,
+                       write_uid = %(uid)s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                  FROM checked c
+                 WHERE t.id = c.id
+                   AND c.anomaly IS NULL
+        )
+        SELECT id, bill_id, subject_id, utility_type, carried_reading, current_reading, anomaly
+          FROM checked
+    """
+
+    def _carry_forward_readings(self):
+        """Fill the empty previous readings of these bills' transactions in one statement.
+
+        Returns (updated transactions, anomaly rows), where each anomaly row is a
+        dict with the transaction id, bill_id, subject_id (stall/unit),
+        utility_type, carried_reading, current_reading and anomaly ('rollover'
+        or 'reset').
+        """
+        Transaction = self.env[self._carry_transaction_model]
+        subject = self._carry_subject_field
+        Transaction.flush(['utility_bill_id', subject, 'utility_type', 'transaction_date',
+                           'previous_reading', 'current_reading'])
+        query = self._carry_forward_query.format(table=Transaction._table, subject=subject)
+        self.env.cr.execute(query, {'bill_ids': tuple(self.ids), 'uid': self.env.uid})
+        rows = self.env.cr.dictfetchall()
+
+        # Readings were written behind the ORM: refresh caches and recompute consumption
+        updated = Transaction.browse([row['id'] for row in rows if not row['anomaly']])
+        Transaction.invalidate_cache(['previous_reading', 'write_uid', 'write_date'], updated.ids)
+        updated.modified(['previous_reading'])
+        return updated, [row for row in rows if row['anomaly']]
+
+    def action_carry_forward_readings(self):
+        """Fill every empty previous reading from the meter's latest earlier reading"""
+        updated, anomalies = self._carry_forward_readings()
+        Transaction = self.env[self._carry_transaction_model]
+        Subject = self.env[Transaction._fields[self._carry_subject_field].comodel_name]
+        names = dict(Subject.browse({row['subject_id'] for row in anomalies}).name_get())
+        lines = [
+            f"{names[row['subject_id']]} ({row['utility_type']}): meter {row['anomaly']}, "
+            f"last reading {row['carried_reading']:,.2f}, current reading {row['current_reading']:,.2f}"
+            for row in anomalies
+        ]
+        for bill in self:
+            count = len(updated.filtered(lambda t: t.utility_bill_id == bill))
+            bill_lines = [line for line, row in zip(lines, anomalies) if row['bill_id'] == bill.id]
+            if count or bill_lines:
+                body = f"Previous readings carried forward on {count} transaction(s)."
+                if bill_lines:
+                    body += "<br/>Not carried (check the meter):<br/>" + "<br/>".join(bill_lines)
+                bill.message_post(body=body)
+
+        message = f"Previous readings carried forward on {len(updated)} transaction(s)."
+        if lines:
+            message += f" {len(lines)} skipped:\n" + "\n".join(lines[:10])
+            if len(lines) > 10:
+                message += f"\n... and {len(lines) - 10} more"
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Readings Carried Forward',
+                'message': message,
+                'type': 'warning' if lines else 'success',
+                'sticky': bool(lines),
+            }
+        }
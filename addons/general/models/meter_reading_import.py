@@ -0,0 +1,240 @@
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+from datetime import date, datetime
+import base64
+import csv
+import io
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class MeterReadingImport(models.AbstractModel):
+    """Shared logic of the meter-reading import wizards on utility bills.
+
+    The uploaded CSV or XLSX file is streamed row by row. Each row is matched
+    to one of the bill's transactions through an in-memory index built from a
+    single search_read (keyed by sub-meter number, stall or unit code...),
+    validated, and the accepted readings are written with chunked UPDATE
+    statements. Rows that cannot be applied are listed in the report.
+
+    Expected columns (header row, case-insensitive): the key column returned
+    by _get_key_column(), current_reading, and optionally previous_reading and
+    transaction_date (to pick the row when a bill has several transactions for
+    the same meter; otherwise the latest one without a reading is used).
+
+    Concrete wizards define bill_id and set _transaction_model, _subject_field
+    (its stall/unit Many2one), _key_column and _subject_key_fields (key column
+    -> field of the stall/unit holding the key).
+    """
+    _name = 'kst.meter.reading.import'
+    _description = 'Meter Reading Import'
+
+    _transaction_model = None
+    _subject_field = None
+    _key_column = None
+    _subject_key_fields = {}
+
+    # Readings written per UPDATE statement
+    _apply_chunk_size = 1000
+
+    file = fields.Binary('File', required=True, attachment=False,
+                         help="CSV or XLSX file with one meter reading per row")
+    filename = fields.Char('File Name')
+    state = fields.Selection([
+        ('upload', 'Upload'),
+        ('done', 'Done'),
+    ], default='upload', required=True)
+    applied_count = fields.Integer('Readings Applied', readonly=True)
+    report = fields.Text('Rows Not Applied', readonly=True)
+
+    def _get_key_column(self):
+        """Column of the file matched against the stalls/units"""
+        return self._key_column
+
+    def _get_subject_keys(self, subject_ids):
+        """Map subject (stall/unit) id to its match key"""
+        fname = self._subject_key_fields[self._get_key_column()]
+        Subject = self.env[self.env[self._transaction_model]._fields[self._subject_field].comodel_name]
+        subjects = Subject.search_read([('id', 'in', list(subject_ids))], [fname])
+        return {subject['id']: subject[fname] for subject in subjects}
+
+    @api.model
+    def _normalize_key(self, value):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value or '').strip().upper()
+
+    @api.model
+    def _normalize_header(self, value):
+        return str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+    def _iter_rows(self):
+        """Yield (line number, {column: value}) without loading the whole sheet.
+
+        Only the parsing is streamed: the upload itself (a Binary field, read
+        as one base64 value) is decoded in memory at once, so the file size
+        is bounded by the server's upload limit.
+        """
+        content = base64.b64decode(self.file)
+        if (self.filename or '').lower().endswith('.xlsx'):
+            if openpyxl is None:
+                raise UserError("Reading XLSX files requires the openpyxl library. "
+                                "Install it or save the sheet as CSV.")
+            workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+            try:
+                rows = workbook.worksheets[0].iter_rows(values_only=True)
+                header = [self._normalize_header(value) for value in next(rows, ())]
+                for line_number, values in enumerate(rows, start=2):
+                    if any(value not in (None, '') for value in values):
+                        yield line_number, dict(zip(header, values))
+            finally:
+                workbook.close()
+        else:
+            reader = csv.reader(io.TextIOWrapper(io.BytesIO(content), encoding='utf-8-sig'))
+            header = [self._normalize_header(value) for value in next(reader, [])]
+            for line_number, values in enumerate(reader, start=2):
+                if any(value.strip() for value in values):
+                    yield line_number, dict(zip(header, values))
+
+    def _build_index(self):
+        """Map match key to the bill's transactions (dicts), latest first, in one query"""
+        subject_field = self._subject_field
+        transactions = self.env[self._transaction_model].search_read(
+            [('utility_bill_id', '=', self.bill_id.id)],
+            [subject_field, 'transaction_date', 'previous_reading', 'current_reading',
+             'verification_status'],
+            order='transaction_date desc, id desc', load=None,
+        )
+        keys = self._get_subject_keys({txn[subject_field] for txn in transactions})
+        index = {}
+        for txn in transactions:
+            key = self._normalize_key(keys.get(txn[subject_field]))
+            if key:
+                index.setdefault(key, []).append(txn)
+        return index
+
+    @api.model
+    def _parse_reading(self, value):
+        if value in (None, ''):
+            return None
+        return float(str(value).replace(',', '').strip())
+
+    @api.model
+    def _parse_date(self, value):
+        if value in (None, ''):
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return fields.Date.to_date(str(value).strip())
+
+    @api.model
+    def _match_transaction(self, candidates, transaction_date):
+        if transaction_date:
+            return next((txn for txn in candidates if txn['transaction_date'] == transaction_date), None)
+        if len(candidates) == 1:
+            return candidates[0]
+        return next((txn for txn in candidates if not txn['current_reading']), candidates[0])
+
+    def _read_file(self):
+        """Stream the file and match every row.
+
+        Returns ({transaction id: (previous_reading, current_reading)}, [error lines]).
+        """
+        Transaction = self.env[self._transaction_model]
+        key_column = self._get_key_column()
+        index = self._build_index()
+        updates, errors = {}, []
+        for line_number, row in self._iter_rows():
+            if key_column not in row or 'current_reading' not in row:
+                raise UserError(f"The file must have the columns '{key_column}' and 'current_reading'.")
+            key = self._normalize_key(row.get(key_column))
+            label = f"Line {line_number} ({key or 'no key'})"
+            try:
+                current = self._parse_reading(row.get('current_reading'))
+                previous = self._parse_reading(row.get('previous_reading'))
+                transaction_date = self._parse_date(row.get('transaction_date'))
+            except ValueError:
+                errors.append(f"{label}: invalid reading or date.")
+                continue
+            if current is None:
+                errors.append(f"{label}: no current reading.")
+                continue
+            candidates = index.get(key)
+            if not candidates:
+                errors.append(f"{label}: no transaction on this bill for this meter.")
+                continue
+            txn = self._match_transaction(candidates, transaction_date)
+            if not txn:
+                errors.append(f"{label}: no transaction on {transaction_date} for this meter.")
+                continue
+            if txn['id'] in updates:
+                errors.append(f"{label}: transaction is already matched by another row.")
+                continue
+            if txn['verification_status'] != 'pending':
+                errors.append(f"{label}: transaction is already {txn['verification_status']}.")
+                continue
+            if previous is None:
+                previous = txn['previous_reading'] or 0.0
+            reading_errors = Transaction._get_reading_errors(previous, current)
+            if reading_errors:
+                errors.extend(f"{label}: {error}" for error in reading_errors)
+                continue
+            updates[txn['id']] = (previous, current)
+        return updates, errors
+
+    def _apply_readings(self, updates):
+        """Write the readings with one UPDATE per chunk, then refresh consumption and amounts"""
+        Transaction = self.env[self._transaction_model]
+        Transaction.flush(['previous_reading', 'current_reading'])
+        for chunk in split_every(self._apply_chunk_size, list(updates.items()), list):
+            ids = [txn_id for txn_id, _readings in chunk]
+            self.env.cr.execute("""
+                UPDATE %s t
+                   SET previous_reading = r.previous_reading,
+                       current_reading = r.current_reading,
+                       write_uid = %%s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                  FROM unnest(%%s::int[], %%s::float8[], %%s::float8[])
+                       AS r(id, previous_reading, current_reading)
+                 WHERE t.id = r.id
+            """ % Transaction._table, (
+                self.env.uid,
+                ids,
+                [readings[0] for _txn_id, readings in chunk],
+                [readings[1] for _txn_id, readings in chunk],
+            ))
+            records = Transaction.browse(ids)
+            Transaction.invalidate_cache(['previous_reading', 'current_reading', 'write_uid', 'write_date'], ids)
+            records.modified(['previous_reading', 'current_reading'])
+            records.recompute()
+        return len(updates)
+
+    def action_import(self):
+        """Import the readings of the file into the bill's transactions"""
+        self.ensure_one()
+        if self.bill_id.collection_status == 'verified':
+            raise UserError("Readings cannot be imported on a verified bill!")
+        updates, errors = self._read_file()
+        applied = self._apply_readings(updates)
+        self.write({
+            'state': 'done',
+            'applied_count': applied,
+            'report': '\n'.join(errors) or False,
+        })
+        self.bill_id.message_post(body=(
+            f"Meter readings imported from {self.filename or 'file'}: "
+            f"{applied} applied, {len(errors)} row(s) not applied."
+        ))
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -0,0 +1,116 @@
+from odoo import api, fields, models
+
+
+class SoaDocument(models.Model):
+    """Rendered Statement of Account for one stall or unit.
+
+    Documents are snapshots: their lines copy the SOA-issuable transactions at
+    generation time, and content_hash identifies those inputs so that
+    generating the same statement again reuses this document instead of
+    rendering it twice (see kst.soa.mixin).
+    """
+    _name = 'kst.soa.document'
+    _description = 'Statement of Account'
+    _order = 'date desc, id desc'
+    _sql_constraints = [
+        ('content_hash_unique', 'UNIQUE(content_hash)', 'A statement with the same content already exists!'),
+    ]
+
+    name = fields.Char('Reference', required=True, readonly=True)
+    date = fields.Date('Statement Date', required=True, readonly=True, default=fields.Date.today)
+    res_model = fields.Char('Account Model', required=True, readonly=True)
+    res_id = fields.Many2oneReference('Account Record', model_field='res_model', required=True, readonly=True)
+    subject_name = fields.Char('Account', readonly=True, help="Stall or unit the statement is issued for")
+    billed_to = fields.Char('Billed To', readonly=True)
+    output_format = fields.Selection([
+        ('pdf', 'PDF'),
+        ('html', 'HTML'),
+    ], string='Format', required=True, default='pdf', readonly=True)
+    content_hash = fields.Char('Content Hash', required=True, readonly=True, index=True,
+                               help="SHA-256 of the statement inputs (account, lines, format, template version)")
+    line_ids = fields.One2many('kst.soa.line', 'document_id', string='Lines', readonly=True)
+    amount_due = fields.Float('Amount Due', digits=(12, 2), compute='_compute_amounts', store=True)
+    amount_paid = fields.Float('Amount Paid', digits=(12, 2), compute='_compute_amounts', store=True)
+    balance = fields.Float('Balance', digits=(12, 2), compute='_compute_amounts', store=True)
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True, ondelete='set null')
+
+    @api.depends('line_ids.amount_due', 'line_ids.amount_paid')
+    def _compute_amounts(self):
+        for record in self:
+            record.amount_due = sum(record.line_ids.mapped('amount_due'))
+            record.amount_paid = sum(record.line_ids.mapped('amount_paid'))
+            record.balance = record.amount_due - record.amount_paid
+
+    def _render(self):
+        """Render these documents and attach the output.
+
+        PDFs of all documents go through a single report rendering (one
+        wkhtmltopdf run), split into one attachment per document by the
+        report's attachment setting. HTML output is rendered per document.
+        """
+        report = self.env.ref('general.action_report_soa_document')
+        pdf_documents = self.filtered(lambda d: d.output_format == 'pdf')
+        if pdf_documents:
+            report._render_qweb_pdf(pdf_documents.ids)
+
+        Attachment = self.env['ir.attachment']
+        for document in self - pdf_documents:
+            html = report._render_qweb_html(document.ids)[0]
+            Attachment.create({
+                'name': f"{document.name}.html",
+                'raw': html,
+                'mimetype': 'text/html',
+                'res_model': self._name,
+                'res_id': document.id,
+            })
+
+        attachments = Attachment.search([('res_model', '=', self._name), ('res_id', 'in', self.ids)],
+                                         order='id desc')
+        by_document = {}
+        for attachment in attachments:
+            by_document.setdefault(attachment.res_id, attachment)
+        for document in self:
+            document.attachment_id = by_document.get(document.id, False)
+
+    def action_download(self):
+        """Download the rendered statement"""
+        self.ensure_one()
+        if not self.attachment_id:
+            self._render()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f"/web/content/{self.attachment_id.id}?download=true",
+            'target': 'self',
+        }
+
+    def action_open_account(self):
+        """Open the stall or unit this statement is issued for"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+        }
+
+
+class SoaLine(models.Model):
+    """Snapshot of one SOA-issuable transaction on a statement"""
+    _name = 'kst.soa.line'
+    _description = 'Statement of Account Line'
+    _order = 'document_id, date, id'
+
+    document_id = fields.Many2one('kst.soa.document', string='Statement', required=True,
+                                  ondelete='cascade', index=True)
+    res_model = fields.Char('Transaction Model', readonly=True)
+    res_id = fields.Many2oneReference('Transaction', model_field='res_model', readonly=True)
+    date = fields.Date('Date', readonly=True)
+    description = fields.Char('Description', readonly=True)
+    amount_due = fields.Float('Amount Due', digits=(12, 2), readonly=True)
+    amount_paid = fields.Float('Amount Paid', digits=(12, 2), readonly=True)
+    balance = fields.Float('Balance', digits=(12, 2), compute='_compute_balance')
+
+    @api.depends('amount_due', 'amount_paid')
+    def _compute_balance(self):
+        for record in self:
+            record.balance = record.amount_due - record.amount_paid
@@ -0,0 +1,158 @@
+from odoo import api, fields, models
+import hashlib
+import json
+
+
+class SoaMixin(models.AbstractModel):
+    """Statement of Account generation for utility transaction models.
+
+    Inheriting models set _soa_subject_field (the stall/unit Many2one the
+    statements are grouped by) and _soa_billed_to_field (the Many2one of the
+    stall/unit the statements are addressed to: tenant, lessor...). They need
+    the utility transaction fields utility_type, amount_due and amount_paid,
+    and the date field named by _soa_date_field (transaction_date by default).
+    Models billing other records on the same statements extend _soa_collect();
+    each row names the model of its line in ``res_model``.
+    """
+    _name = 'kst.soa.mixin'
+    _description = 'Statement of Account Mixin'
+
+    _soa_subject_field = None
+    _soa_billed_to_field = None
+    _soa_date_field = 'transaction_date'
+
+    # Bump when the SOA template changes so cached statements are rendered again
+    _soa_template_version = 1
+
+    @api.model
+    def _soa_subject_info(self, subject_ids):
+        """Map subject id to (account name, billed to)"""
+        subjects = self.env[self._fields[self._soa_subject_field].comodel_name].browse(subject_ids)
+        infos = {}
+        for subject in subjects:
+            billed_to = subject[self._soa_billed_to_field] if self._soa_billed_to_field else None
+            infos[subject.id] = (subject.display_name, billed_to and billed_to.display_name or '')
+        return infos
+
+    @api.model
+    def _soa_collect(self, domain):
+        """Every SOA-issuable transaction matching ``domain`` (ordered by subject) in one query.
+
+        Issuable means underpaid, as in _compute_soa_issuable: amount_due > 0
+        and amount_paid < amount_due. Record rules of the current user apply.
+        """
+        self.flush([self._soa_subject_field, self._soa_date_field, 'utility_type', 'amount_due', 'amount_paid'])
+        # Archived history is part of the statement
+        query = self.with_context(active_test=False)._where_calc(domain)
+        self._apply_ir_rules(query, 'read')
+        from_clause, where_clause, params = query.get_sql()
+        table = '"%s"' % self._table
+        self.env.cr.execute("""
+            SELECT {table}.id, {table}.{subject} AS subject_id, {table}.{date} AS transaction_date,
+                   {table}.utility_type, {table}.amount_due, COALESCE({table}.amount_paid, 0) AS amount_paid
+              FROM {from_clause}
+             WHERE {where_clause}
+               AND {table}.amount_due > 0
+               AND COALESCE({table}.amount_paid, 0) < {table}.amount_due
+          ORDER BY subject_id, {table}.{date}, {table}.id
+        """.format(table=table, subject='"%s"' % self._soa_subject_field, date='"%s"' % self._soa_date_field,
+                   from_clause=from_clause, where_clause=where_clause or 'TRUE'), params)
+        rows = self.env.cr.dictfetchall()
+        for row in rows:
+            row['res_model'] = self._name
+        return rows
+
+    @api.model
+    def _soa_hash(self, subject_id, info, rows, output_format):
+        payload = json.dumps([
+            self._name, subject_id, list(info), output_format, self._soa_template_version,
+            [(row['res_model'], row['id'], str(row['transaction_date']), row['utility_type'],
+              round(row['amount_due'], 2), round(row['amount_paid'], 2)) for row in rows],
+        ])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @api.model
+    def _soa_line_description(self, row):
+        utility_types = dict(self._fields['utility_type']._description_selection(self.env))
+        return f"{utility_types.get(row['utility_type'], row['utility_type'] or '')} - {row['transaction_date']}"
+
+    @api.model
+    def _soa_generate(self, domain, output_format='pdf'):
+        """Generate the statements of every subject with SOA-issuable transactions in ``domain``.
+
+        Statements whose inputs are unchanged (same content hash) are reused;
+        only the new ones are rendered, in one batch.
+        Returns (documents, rendered count, reused count).
+        """
+        rows_by_subject = {}
+        for row in self._soa_collect(domain):
+            rows_by_subject.setdefault(row['subject_id'], []).append(row)
+        Document = self.env['kst.soa.document']
+        if not rows_by_subject:
+            return Document, 0, 0
+
+        infos = self._soa_subject_info(list(rows_by_subject))
+        hashes = {
+            subject_id: self._soa_hash(subject_id, infos[subject_id], rows, output_format)
+            for subject_id, rows in rows_by_subject.items()
+        }
+        existing = Document.search([('content_hash', 'in', list(hashes.values()))])
+        cached = set(existing.mapped('content_hash'))
+
+        subject_model = self._fields[self._soa_subject_field].comodel_name
+        today = fields.Date.today()
+        vals_list = []
+        for subject_id, rows in rows_by_subject.items():
+            if hashes[subject_id] in cached:
+                continue
+            subject_name, billed_to = infos[subject_id]
+            vals_list.append({
+                'name': f"SOA {subject_name} {today}",
+                'date': today,
+                'res_model': subject_model,
+                'res_id': subject_id,
+                'subject_name': subject_name,
+                'billed_to': billed_to,
+                'output_format': output_format,
+                'content_hash': hashes[subject_id],
+                'line_ids': [(0, 0, {
+                    'res_model': row['res_model'],
+                    'res_id': row['id'],
+                    'date': row['transaction_date'],
+                    'description': self._soa_line_description(row),
+                    'amount_due': row['amount_due'],
+                    'amount_paid': row['amount_paid'],
+                }) for row in rows],
+            })
+        rendered = Document.create(vals_list)
+        rendered._render()
+        return existing | rendered, len(rendered), len(existing)
+
+    @api.model
+    def _soa_queue(self, domain, scope, output_format='pdf'):
+        """Queue the generation as a background SOA run and notify the user"""
+        self.env['kst.soa.run']._queue(self._name, domain, scope, output_format)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'SOA Generation Queued',
+                'message': f"Statements of Account for {scope} are being generated in the background. "
+                           "Follow the run under General > Statements of Account.",
+                'type': 'success',
+                'sticky': False,
+            }
+        }
+
+    def _soa_open(self, documents):
+        """Window action on generated statements"""
+        action = {
+            'name': 'Statements of Account',
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.soa.document',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', documents.ids)],
+        }
+        if len(documents) == 1:
+            action.update(view_mode='form', res_id=documents.id)
+        return action
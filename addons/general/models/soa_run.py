@@ -0,0 +1,97 @@
+from odoo import api, fields, models
+from odoo.tools.safe_eval import safe_eval
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SoaRun(models.Model):
+    """Queued Statement of Account generation job.
+
+    Runs are created by the "Generate SOA" actions of bills, markets and
+    lessors and processed in the background by the SOA cron, which is
+    triggered as soon as a run is queued. Each run generates the statements
+    of every account in its scope in one pass (see kst.soa.mixin).
+    """
+    _name = 'kst.soa.run'
+    _description = 'Statement of Account Run'
+    _order = 'id desc'
+
+    name = fields.Char('Scope', required=True, readonly=True)
+    source_model = fields.Char('Transaction Model', required=True, readonly=True)
+    domain = fields.Text('Domain', required=True, readonly=True, default='[]')
+    output_format = fields.Selection([
+        ('pdf', 'PDF'),
+        ('html', 'HTML'),
+    ], string='Format', required=True, default='pdf', readonly=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='queued', required=True, readonly=True)
+    requested_by = fields.Many2one('res.users', string='Requested By', readonly=True,
+                                   default=lambda self: self.env.user)
+    date_done = fields.Datetime('Completed On', readonly=True)
+    document_ids = fields.Many2many('kst.soa.document', string='Statements', readonly=True)
+    document_count = fields.Integer('Statements', compute='_compute_document_count')
+    rendered_count = fields.Integer('Rendered', readonly=True)
+    reused_count = fields.Integer('Reused', readonly=True, help="Unchanged statements served from cache")
+    error = fields.Text('Error', readonly=True)
+
+    @api.depends('document_ids')
+    def _compute_document_count(self):
+        for record in self:
+            record.document_count = len(record.document_ids)
+
+    @api.model
+    def _queue(self, source_model, domain, scope, output_format='pdf'):
+        run = self.create({
+            'name': scope,
+            'source_model': source_model,
+            'domain': repr(domain),
+            'output_format': output_format,
+        })
+        self.env.ref('general.ir_cron_soa_run')._trigger()
+        return run
+
+    def _process(self):
+        for run in self:
+            try:
+                with self.env.cr.savepoint():
+                    documents, rendered, reused = self.env[run.source_model].with_user(run.requested_by)._soa_generate(
+                        safe_eval(run.domain), run.output_format)
+            except Exception as e:
+                _logger.exception("SOA run %s failed", run.id)
+                run.write({'state': 'failed', 'error': str(e), 'date_done': fields.Datetime.now()})
+                continue
+            run.write({
+                'state': 'done',
+                'document_ids': [(6, 0, documents.ids)],
+                'rendered_count': rendered,
+                'reused_count': reused,
+                'error': False,
+                'date_done': fields.Datetime.now(),
+            })
+            _logger.info("SOA run %s: %s statements rendered, %s reused", run.id, rendered, reused)
+
+    @api.model
+    def _cron_process_runs(self):
+        """Process queued SOA runs, committing after each one."""
+        for run in self.search([('state', '=', 'queued')], order='id'):
+            run._process()
+            self.env.cr.commit()
+
+    def action_retry(self):
+        """Run a failed generation again in the foreground"""
+        self.filtered(lambda r: r.state == 'failed')._process()
+
+    def action_view_documents(self):
+        """Action to view the statements of this run"""
+        self.ensure_one()
+        return {
+            'name': 'Statements of Account',
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.soa.document',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', self.document_ids.ids)],
+        }
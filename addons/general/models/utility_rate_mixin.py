@@ -0,0 +1,152 @@
+from odoo import api, models
+
+
+class UtilityRateMixin(models.AbstractModel):
+    """Rate-change-safe amount_due for utility transaction models.
+
+    amount_due does not depend on the default rates of the stall/unit, so
+    editing a default rate no longer rewrites the whole history of the
+    account. Instead, the account model calls _reprice_open_transactions()
+    after the change: open transactions (pending review, nothing paid yet)
+    still priced at the old default get the new rate in one UPDATE, and only
+    their amount_due is recomputed. Verified transactions are frozen: their
+    stored amount_due is kept whatever changes (see _get_frozen_amount_due).
+
+    Inheriting models set _rate_subject_field (the stall/unit Many2one) and
+    need the fields utility_type, applied_rate, amount_due, amount_paid and
+    verification_status.
+    """
+    _name = 'kst.utility.rate.mixin'
+    _description = 'Utility Rate Mixin'
+
+    _rate_subject_field = None
+
+    # utility_type -> default rate field of the stall/unit
+    _rate_default_fields = {
+        'electricity': 'default_electricity_rate',
+        'water': 'default_water_rate',
+    }
+
+    def _get_frozen_amount_due(self):
+        """Map the id of every verified record of ``self`` to its stored amount_due.
+
+        Compute methods assign these values back instead of recomputing them.
+        """
+        frozen_ids = tuple(record._origin.id for record in self
+                           if record._origin.id and record.verification_status == 'verified')
+        if not frozen_ids:
+            return {}
+        self.env.cr.execute(
+            "SELECT id, amount_due FROM %s WHERE id IN %%s" % self._table, (frozen_ids,))
+        return {res_id: amount_due or 0.0 for res_id, amount_due in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_default_rates(self, subject_ids):
+        """Map subject id to {utility_type: default rate}, read in one query"""
+        subject_ids = [subject_id for subject_id in set(subject_ids) if subject_id]
+        if not subject_ids:
+            return {}
+        Subject = self.env[self._fields[self._rate_subject_field].comodel_name]
+        rows = Subject.browse(subject_ids).read(list(self._rate_default_fields.values()))
+        return {
+            row['id']: {utility_type: row[fname] or 0.0
+                        for utility_type, fname in self._rate_default_fields.items()}
+            for row in rows
+        }
+
+    @api.model
+    def _set_default_applied_rates(self, vals_list):
+        """Fill applied_rate from the default rates where it is not provided (or 0).
+
+        Reads the rates of all referenced stalls/units at once, so creating
+        many transactions costs a constant number of queries.
+        """
+        subject = self._rate_subject_field
+        missing = [vals for vals in vals_list
+                   if not vals.get('applied_rate') and vals.get(subject) and vals.get('utility_type')]
+        rates = self._get_default_rates([vals[subject] for vals in missing])
+        for vals in missing:
+            vals['applied_rate'] = rates.get(vals[subject], {}).get(vals['utility_type'], 0.0)
+        return vals_list
+
+    @api.model
+    def _get_rate_changes(self, subjects, vals):
+        """Snapshot the default rates ``vals`` is about to change on ``subjects``.
+
+        Call before writing; returns the list of (subject id, utility type,
+        old rate, new rate) to pass to _reprice_open_transactions().
+        """
+        changes = []
+        for utility_type, fname in self._rate_default_fields.items():
+            if fname not in vals:
+                continue
+            new_rate = vals[fname] or 0.0
+            for subject in subjects:
+                old_rate = subject[fname] or 0.0
+                if old_rate != new_rate:
+                    changes.append((subject.id, utility_type, old_rate, new_rate))
+        return changes
+
+    @api.model
+    def _reprice_open_transactions(self, changes):
+        """Apply default rate changes to the open transactions of the accounts.
+
+        ``changes`` is a list of (subject id, utility type, old rate, new rate).
+        Open transactions (pending review, nothing paid) whose applied rate is
+        still the old default (or unset) get the new rate in one UPDATE; then
+        only their amount_due is recomputed. Transactions priced from a bill
+        or by hand keep their rate. Returns the repriced records.
+        """
+        if not changes:
+            return self.browse()
+        subject = self._rate_subject_field
+        self.flush([subject, 'utility_type', 'applied_rate', 'amount_paid', 'verification_status'])
+        self.env.cr.execute("""
+            WITH target AS (
+                SELECT t.id, COALESCE(t.applied_rate, 0) AS old_rate, c.new_rate
+                  FROM {table} t
+                  JOIN unnest(%s::int[], %s::varchar[], %s::numeric[], %s::numeric[])
+                       AS c(subject_id, utility_type, old_rate, new_rate)
+                       ON t.{subject} = c.subject_id AND t.utility_type = c.utility_type
+                 WHERE t.verification_status = 'pending'
+                   AND COALESCE(t.amount_paid, 0) = 0
+                   AND (COALESCE(t.applied_rate, 0) = 0 OR ROUND(t.applied_rate::numeric, 2) = c.old_rate)
+                   FOR UPDATE OF t
+            )
+            UPDATE {table} t
+               SET applied_rate = target.new_rate,
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+              FROM target
+             WHERE t.id = target.id
+         RETURNING t.id, t.{subject}, target.old_rate, target.new_rate
+        """.format(table=self._table, subject=subject), (
+            [change[0] for change in changes],
+            [change[1] for change in changes],
+            [round(change[2], 2) for change in changes],
+            [round(change[3], 2) for change in changes],
+            self.env.uid,
+        ))
+        rows = self.env.cr.fetchall()
+        records = self.browse([row[0] for row in rows])
+        if records:
+            if hasattr(self, '_compact_audit_enabled') and self._compact_audit_enabled():
+                self.env['kst.audit.log']._log(self._name, 'write', [
+                    (res_id, {'applied_rate': [float(old_rate), float(new_rate)]})
+                    for res_id, _subject_id, old_rate, new_rate in rows
+                ])
+            self.invalidate_cache(['applied_rate', 'write_uid', 'write_date'], records.ids)
+            records.modified(['applied_rate'])
+            records.recompute()
+
+        counts = {}
+        for _res_id, subject_id, _old_rate, _new_rate in rows:
+            counts[subject_id] = counts.get(subject_id, 0) + 1
+        # Only accounts that actually had open transactions repriced get a note
+        subjects = self.env[self._fields[subject].comodel_name].browse(sorted(counts))
+        for record in subjects:
+            record.message_post(body=(
+                f"Default rate change applied to {counts[record.id]} open "
+                f"{self._description.lower()}(s). Verified and paid transactions keep their amounts."
+            ))
+        return records
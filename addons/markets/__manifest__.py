@@ -1,6 +1,6 @@
 {
     'name': 'Markets',
-    'version': '2.0.0',
+    'version': '2.5.0',
     'category': 'Markets',
     'summary': 'Manage market rentals, stall listings, utility bills, and rent/utility collections',
     'description': """
@@ -13,6 +13,8 @@
         * Market rent collections
         * Utility (electricity and water) billing and collections
         * Derived rates and metered vs. flat-rate billing
+        * Monthly collection sheets for daily flat-rate utilities
+        * Daily collection report per market (materialized, pivot and graph)
     """,
     'depends': [
         'base',
@@ -23,7 +25,9 @@
     'data': [
         'security/security.xml',
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/market_views.xml',
+        'views/market_holiday_views.xml',
         'views/tenant_views.xml',
         'views/market_pay_type_views.xml',
         'views/stall_views.xml',
@@ -31,8 +35,11 @@
         'views/market_rent_transaction_views.xml',
         'views/market_rent_batch_views.xml',
         'views/market_utility_transaction_views.xml',
+        'views/utility_sheet_views.xml',
+        'views/stall_scheduled_payment_views.xml',
         'views/utility_bill_views.xml',
         'views/utility_account_views.xml',
+        'views/daily_collection_report_views.xml',
     ],
     'demo': [
         'demo/markets_demo.xml',      # Markets (must be first)
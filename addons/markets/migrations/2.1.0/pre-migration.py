@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+def migrate(cr, version):
+    """
+    kst.stall.scheduled.payment used to be a transient model backed by a table.
+    It is now a SQL view, so drop the old table before the view is created.
+    """
+    cr.execute("""
+        SELECT 1 FROM pg_class
+        WHERE relname = 'kst_stall_scheduled_payment'
+        AND relkind = 'r'
+    """)
+    if cr.fetchone():
+        cr.execute("""
+            DROP TABLE kst_stall_scheduled_payment CASCADE
+        """)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """
+    copb_due used to be typed in by hand; it is now derived from the stall
+    ledger. Keep the arrears recorded before the first transaction of each
+    stall as its opening COPB balance, then compute every ledger once.
+    """
+    cr.execute("""
+        UPDATE kst_stall s
+           SET copb_opening_balance = first.copb_due
+          FROM (
+                SELECT DISTINCT ON (stall_id) stall_id, COALESCE(copb_due, 0) AS copb_due
+                  FROM kst_market_rent_transaction
+              ORDER BY stall_id, transaction_date, id
+               ) first
+         WHERE s.id = first.stall_id
+           AND s.copb_opening_balance IS NULL
+    """)
+    cr.execute("SELECT DISTINCT stall_id FROM kst_market_rent_transaction")
+    stall_ids = [row[0] for row in cr.fetchall()]
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['kst.market.rent.transaction']._recompute_copb(dict.fromkeys(stall_ids))
+    env['kst.stall'].browse(stall_ids)._rebuild_payment_summary()
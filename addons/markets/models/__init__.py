@@ -1,12 +1,20 @@
 from . import market
+from . import market_holiday
+from . import collection_calendar
 from . import tenant
 from . import market_pay_type
 from . import stall
 from . import utility_bill
+from . import utility_bill_reading_import
 from . import payment_attachment
+from . import payment_verification_mixin
 from . import market_rent_transaction
 from . import market_utility_transaction
+from . import utility_sheet
 from . import stall_scheduled_payment
 from . import utility_account
 from . import market_rent_batch
+from . import market_rent_batch_generate
 
+from . import index_check
+from . import daily_collection_report
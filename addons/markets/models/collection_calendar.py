@@ -0,0 +1,119 @@
+from odoo import api, models, tools
+from datetime import date, timedelta
+import bisect
+import calendar
+
+
+class CollectionCalendar(models.AbstractModel):
+    """Shared collection calendar for rent batches, stall schedules and utility bills.
+
+    Collection dates are derived per market from:
+    - daily: the market's daily collection days (default Monday-Friday)
+    - weekly: the market's weekly collection weekday (default Monday)
+    - monthly: the first daily collection day of each month
+    Holidays (global or market-specific) are never collection dates.
+
+    Dates are memoized per market, frequency and month, so listing the
+    collection dates of a period is a cache lookup instead of a day-by-day loop.
+    The cache is cleared whenever holidays or market calendar settings change.
+    """
+    _name = 'kst.collection.calendar'
+    _description = 'Collection Calendar'
+
+    # Max months scanned forward when looking for the next collection date
+    _max_search_months = 24
+
+    @api.model
+    @tools.ormcache('market_id')
+    def _get_market_rules(self, market_id):
+        """Return (weekday_limit, collection_weekday) for a market.
+
+        Daily collection happens on weekdays < weekday_limit (5 = Monday-Friday).
+        """
+        market = self.env['kst.market'].browse(market_id) if market_id else None
+        if not market:
+            return 5, 0
+        return (
+            market._get_daily_weekday_limit(),
+            int(market.collection_weekday or 0),
+        )
+
+    @api.model
+    @tools.ormcache('market_id')
+    def _get_closed_dates(self, market_id):
+        """Holidays that close this market (global holidays plus market-specific ones)."""
+        holidays = self.env['kst.market.holiday'].sudo().search_read(
+            [('market_id', 'in', [False, market_id or False])], ['date'])
+        return frozenset(holiday['date'] for holiday in holidays)
+
+    @api.model
+    @tools.ormcache('market_id', 'frequency', 'year', 'month')
+    def _get_month_collection_dates(self, market_id, frequency, year, month):
+        """Sorted tuple of collection dates of one month."""
+        weekday_limit, collection_weekday = self._get_market_rules(market_id)
+        closed = self._get_closed_dates(market_id)
+        first = date(year, month, 1)
+        days_in_month = calendar.monthrange(year, month)[1]
+
+        if frequency == 'daily':
+            days = (first + timedelta(days=i) for i in range(days_in_month))
+            candidates = [d for d in days if d.weekday() < weekday_limit]
+        elif frequency == 'weekly':
+            # First matching weekday of the month, then every 7 days
+            offset = (collection_weekday - first.weekday()) % 7
+            candidates = [first + timedelta(days=i) for i in range(offset, days_in_month, 7)]
+        elif frequency == 'monthly':
+            daily = self._get_month_collection_dates(market_id, 'daily', year, month)
+            return daily[:1]
+        else:
+            return ()
+
+        return tuple(d for d in candidates if d not in closed)
+
+    @api.model
+    def _iter_months(self, date_from, date_to):
+        year, month = date_from.year, date_from.month
+        while (year, month) <= (date_to.year, date_to.month):
+            yield year, month
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    @api.model
+    def _get_collection_dates(self, market_id, frequency, date_from, date_to):
+        """List the collection dates between date_from and date_to (inclusive)."""
+        if not frequency or not date_from or not date_to or date_to < date_from:
+            return []
+        dates = []
+        for year, month in self._iter_months(date_from, date_to):
+            month_dates = self._get_month_collection_dates(market_id, frequency, year, month)
+            lo = bisect.bisect_left(month_dates, date_from)
+            hi = bisect.bisect_right(month_dates, date_to)
+            dates.extend(month_dates[lo:hi])
+        return dates
+
+    @api.model
+    def _is_collection_date(self, market_id, frequency, day):
+        """Whether ``day`` is a collection date for this market and frequency."""
+        if not frequency or not day:
+            return False
+        month_dates = self._get_month_collection_dates(market_id, frequency, day.year, day.month)
+        index = bisect.bisect_left(month_dates, day)
+        return index < len(month_dates) and month_dates[index] == day
+
+    @api.model
+    def _next_collection_date(self, market_id, frequency, from_date):
+        """First collection date strictly after ``from_date``, or False if none is found."""
+        if not frequency or not from_date:
+            return False
+        year, month = from_date.year, from_date.month
+        for _i in range(self._max_search_months):
+            month_dates = self._get_month_collection_dates(market_id, frequency, year, month)
+            index = bisect.bisect_right(month_dates, from_date)
+            if index < len(month_dates):
+                return month_dates[index]
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return False
+
+    @api.model
+    def _invalidate_calendar(self):
+        """Drop memoized calendar data after holidays or market settings change."""
+        self.clear_caches()
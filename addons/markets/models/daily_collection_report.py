@@ -0,0 +1,135 @@
+from odoo import api, fields, models
+
+
+class MarketDailyCollectionReport(models.Model):
+    """Daily collection totals per market and collection type.
+
+    Backed by the materialized view kst_market_daily_collection_report,
+    which aggregates rent transactions, utility transactions and the days
+    kept on monthly utility collection sheets (rejected and bounced payments
+    excluded), so pivot and graph views read pre-aggregated rows instead of
+    scanning the transaction tables. Utility collections are reported under
+    the rent collection type of their stall.
+
+    The view is refreshed concurrently (readers are never blocked) by a cron
+    job, which is also triggered whenever payments or rent batches are
+    verified; see _schedule_refresh().
+    """
+    _name = 'kst.market.daily.collection.report'
+    _description = 'Daily Collection Report'
+    _auto = False
+    _order = 'date desc, market_id, collection_type'
+    _rec_name = 'date'
+
+    market_id = fields.Many2one('kst.market', string='Market', readonly=True)
+    date = fields.Date('Date', readonly=True)
+    collection_type = fields.Selection([
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+    ], string='Collection Type', readonly=True)
+    rent_count = fields.Integer('Rent Transactions', readonly=True)
+    utility_count = fields.Integer('Utility Collections', readonly=True,
+                                   help="Utility transactions and collection sheet days")
+    rent_expected = fields.Float('Expected Rent', digits=(12, 2), readonly=True)
+    rent_paid = fields.Float('Rent Paid', digits=(12, 2), readonly=True)
+    rent_balance = fields.Float('Rent Balance', digits=(12, 2), readonly=True,
+                                help="Expected rent minus rent paid")
+    copb_due = fields.Float('COPB Due', digits=(12, 2), readonly=True)
+    copb_paid = fields.Float('COPB Paid', digits=(12, 2), readonly=True)
+    utility_due = fields.Float('Utility Due', digits=(12, 2), readonly=True)
+    electricity_paid = fields.Float('Electricity Paid', digits=(12, 2), readonly=True)
+    water_paid = fields.Float('Water Paid', digits=(12, 2), readonly=True)
+    utility_paid = fields.Float('Utilities Paid', digits=(12, 2), readonly=True)
+    total_paid = fields.Float('Total Collected', digits=(12, 2), readonly=True,
+                              help="Rent, COPB and utilities paid")
+
+    # One line per collected item, then one row per market, date and collection
+    # type. Sheet days come from the collection days still kept on the sheet
+    # (bit day - 1 of collection_mask, not materialized); their amount is the
+    # day's entry of the amounts_paid JSON list.
+    _report_query = """
+        WITH line AS (
+                SELECT t.market_id, t.transaction_date AS date,
+                       COALESCE(t.rent_collection_type, 'daily') AS collection_type,
+                       1 AS rent_count, 0 AS utility_count,
+                       COALESCE(t.rent, 0) AS rent_expected, COALESCE(t.rent_paid, 0) AS rent_paid,
+                       COALESCE(t.copb_due, 0) AS copb_due, COALESCE(t.copb_paid, 0) AS copb_paid,
+                       0 AS utility_due, 0 AS electricity_paid, 0 AS water_paid
+                  FROM kst_market_rent_transaction t
+                 WHERE t.verification_status != 'rejected'
+             UNION ALL
+                SELECT u.market_id, u.transaction_date,
+                       COALESCE(s.rent_collection_type, 'daily'),
+                       0, 1, 0, 0, 0, 0,
+                       CASE WHEN COALESCE(u.is_absent, FALSE) THEN 0 ELSE COALESCE(u.amount_due, 0) END,
+                       CASE WHEN u.utility_type = 'electricity' THEN COALESCE(u.amount_paid, 0) ELSE 0 END,
+                       CASE WHEN u.utility_type = 'water' THEN COALESCE(u.amount_paid, 0) ELSE 0 END
+                  FROM kst_market_utility_transaction u
+                  JOIN kst_stall s ON s.id = u.stall_id
+                 WHERE u.verification_status NOT IN ('rejected', 'check_bounced')
+             UNION ALL
+                SELECT sh.market_id, sh.month + (d.day - 1),
+                       COALESCE(s.rent_collection_type, 'daily'),
+                       0, 1, 0, 0, 0, 0,
+                       CASE WHEN COALESCE(sh.absence_mask, 0) & (1 << (d.day - 1)) = 0 THEN COALESCE(sh.applied_rate, 0) ELSE 0 END,
+                       CASE WHEN sh.utility_type = 'electricity' THEN day_amount.amount ELSE 0 END,
+                       CASE WHEN sh.utility_type = 'water' THEN day_amount.amount ELSE 0 END
+                  FROM kst_market_utility_sheet sh
+                  JOIN kst_stall s ON s.id = sh.stall_id
+            CROSS JOIN generate_series(1, 31) AS d(day)
+            CROSS JOIN LATERAL (
+                       SELECT COALESCE((COALESCE(NULLIF(sh.amounts_paid, ''), '[]')::jsonb ->> (d.day - 1))::numeric, 0)
+                              AS amount
+                       ) day_amount
+                 WHERE sh.verification_status NOT IN ('rejected', 'check_bounced')
+                   AND COALESCE(sh.collection_mask, 0) & ~COALESCE(sh.materialized_mask, 0) & (1 << (d.day - 1)) != 0
+        )
+        SELECT ROW_NUMBER() OVER (ORDER BY date, market_id, collection_type) AS id,
+               market_id, date, collection_type,
+               SUM(rent_count) AS rent_count,
+               SUM(utility_count) AS utility_count,
+               SUM(rent_expected) AS rent_expected,
+               SUM(rent_paid) AS rent_paid,
+               SUM(rent_expected) - SUM(rent_paid) AS rent_balance,
+               SUM(copb_due) AS copb_due,
+               SUM(copb_paid) AS copb_paid,
+               SUM(utility_due) AS utility_due,
+               SUM(electricity_paid) AS electricity_paid,
+               SUM(water_paid) AS water_paid,
+               SUM(electricity_paid) + SUM(water_paid) AS utility_paid,
+               SUM(rent_paid) + SUM(copb_paid) + SUM(electricity_paid) + SUM(water_paid) AS total_paid
+          FROM line
+         WHERE market_id IS NOT NULL AND date IS NOT NULL
+      GROUP BY market_id, date, collection_type
+    """
+
+    def init(self):
+        # Recreated on every upgrade so that query changes apply; a plain view
+        # left by an older version is dropped as well
+        self.env.cr.execute("SELECT relkind FROM pg_class WHERE relname = %s", (self._table,))
+        row = self.env.cr.fetchone()
+        if row:
+            self.env.cr.execute("DROP %s IF EXISTS %s CASCADE" % (
+                'MATERIALIZED VIEW' if row[0] == 'm' else 'VIEW', self._table))
+        self.env.cr.execute("CREATE MATERIALIZED VIEW %s AS (%s)" % (self._table, self._report_query))
+        # REFRESH ... CONCURRENTLY needs a unique index over plain columns
+        self.env.cr.execute("CREATE UNIQUE INDEX %s_key_index ON %s (market_id, date, collection_type)" % (
+            self._table, self._table))
+        self.env.cr.execute("CREATE INDEX %s_date_index ON %s (date)" % (self._table, self._table))
+
+    @api.model
+    def _refresh(self):
+        """Recompute the report rows without blocking readers"""
+        for model in ('kst.market.rent.transaction', 'kst.market.utility.transaction', 'kst.market.utility.sheet'):
+            self.env[model].flush()
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_cache()
+
+    @api.model
+    def _schedule_refresh(self):
+        """Refresh the report soon, in the cron worker (several calls lead to one refresh)"""
+        self.env.ref('markets.ir_cron_daily_collection_report_refresh')._trigger()
+
+    @api.model
+    def _cron_refresh(self):
+        self._refresh()
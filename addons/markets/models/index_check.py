@@ -0,0 +1,49 @@
+from odoo import api, models
+
+
+class IndexCheck(models.TransientModel):
+    _inherit = 'kst.index.check'
+
+    @api.model
+    def _get_index_checks(self):
+        Rent = self.env['kst.market.rent.transaction']
+        Utility = self.env['kst.market.utility.transaction']
+        return super()._get_index_checks() + [
+            ("Transactions of a rent batch", Rent._name,
+             [('rent_batch_id', '=', 0)], 'transaction_date', Rent._get_index_name('batch_date')),
+            ("Pending transactions of a rent batch", Rent._name,
+             [('rent_batch_id', '=', 0), ('verification_status', '=', 'pending')], None,
+             Rent._get_index_name('pending_batch')),
+            ("Rent history of a stall", Rent._name,
+             [('stall_id', '=', 0)], 'transaction_date desc', Rent._get_index_name('stall_date')),
+            ("Pending rent review list", Rent._name,
+             [('verification_status', '=', 'pending')], None, Rent._get_index_name('pending_date')),
+            ("Rent transaction list (non-archived rows)", Rent._name,
+             [('active', '=', True)], None, Rent._get_index_name('hot_date')),
+            ("Utility transaction list (non-archived rows)", Utility._name,
+             [('active', '=', True)], None, Utility._get_index_name('hot_date')),
+            ("Utility transactions of a bill and stall", Utility._name,
+             [('utility_bill_id', '=', 0), ('stall_id', '=', 0), ('utility_type', '=', 'electricity')], None,
+             Utility._get_index_name('bill_stall_type')),
+            ("Utility history of a stall", Utility._name,
+             [('stall_id', '=', 0), ('utility_type', '=', 'water')], 'transaction_date desc',
+             Utility._get_index_name('stall_type_date')),
+            ("Pending utility transactions of a bill", Utility._name,
+             [('utility_bill_id', '=', 0), ('verification_status', '=', 'pending')], None,
+             Utility._get_index_name('pending_bill')),
+            ("Active stalls of a market by collection type", 'kst.stall',
+             [('market_id', '=', 0), ('rent_collection_type', '=', 'daily'), ('is_active', '=', True)], None,
+             self.env['kst.stall']._get_index_name('active_market_collection')),
+            ("Stalls with arrears", 'kst.stall',
+             [('total_copb_due', '>', 0)], None, self.env['kst.stall']._get_index_name('arrears')),
+            ("Stalls of an electricity account", 'kst.stall',
+             [('electricity_utility_account_id', '=', 0)], None, 'kst_stall_electricity_utility_account_id_index'),
+            ("Stalls of a water account", 'kst.stall',
+             [('water_utility_account_id', '=', 0)], None, 'kst_stall_water_utility_account_id_index'),
+            ("Rent batches of a market and period", 'kst.market.rent.batch',
+             [('market_id', '=', 0), ('collection_date', '>=', '2000-01-01'), ('collection_type', '=', 'daily')],
+             None, self.env['kst.market.rent.batch']._get_index_name('market_date_type')),
+            ("Underpaid utility bills of a period", 'kst.utility.bill',
+             [('has_underpayment', '=', True), ('bill_date', '>=', '2000-01-01')], None,
+             self.env['kst.utility.bill']._get_index_name('underpayment')),
+        ]
@@ -15,6 +15,25 @@ class Market(models.Model):
     name = fields.Char('Market Name', required=True, tracking=True)
     address = fields.Text('Address', tracking=True)
     
+    # Collection Calendar
+    daily_collection_days = fields.Selection([
+        ('mon_fri', 'Monday to Friday'),
+        ('mon_sat', 'Monday to Saturday'),
+        ('all', 'Every Day'),
+    ], string='Daily Collection Days', default='mon_fri', required=True, tracking=True,
+       help="Days on which daily rent and utilities are collected")
+    collection_weekday = fields.Selection([
+        ('0', 'Monday'),
+        ('1', 'Tuesday'),
+        ('2', 'Wednesday'),
+        ('3', 'Thursday'),
+        ('4', 'Friday'),
+        ('5', 'Saturday'),
+        ('6', 'Sunday'),
+    ], string='Weekly Collection Day', default='0', required=True, tracking=True,
+       help="Weekday on which weekly rent and utilities are collected")
+    holiday_ids = fields.One2many('kst.market.holiday', 'market_id', string='Holidays')
+    
     # One2many relationships
     stall_ids = fields.One2many('kst.stall', 'market_id', string='Stalls')
     stall_count = fields.Integer('Number of Stalls', compute='_compute_stall_count')
@@ -24,6 +43,25 @@ class Market(models.Model):
         for record in self:
             record.stall_count = len(record.stall_ids)
 
+    def _get_daily_weekday_limit(self):
+        """Daily collection happens on weekdays below this limit (Monday=0)"""
+        return {'mon_sat': 6, 'all': 7}.get(self.daily_collection_days, 5)
+
+    def write(self, vals):
+        result = super().write(vals)
+        if {'daily_collection_days', 'collection_weekday'} & set(vals):
+            self.env['kst.collection.calendar']._invalidate_calendar()
+            self.env['kst.stall'].search([
+                ('market_id', 'in', self.ids),
+                ('is_active', '=', True),
+            ])._schedule_next_payment_date_recompute()
+        return result
+
+    def action_generate_soa(self):
+        """Queue the Statements of Account of every underpaid stall of these markets (month-end run)"""
+        return self.env['kst.market.utility.transaction']._soa_queue(
+            [('market_id', 'in', self.ids)], ', '.join(self.mapped('display_name')))
+
     def name_get(self):
         result = []
         for record in self:
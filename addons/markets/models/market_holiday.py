@@ -0,0 +1,55 @@
+from odoo import api, fields, models
+
+
+class MarketHoliday(models.Model):
+    _name = 'kst.market.holiday'
+    _description = 'Market Holiday'
+    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _sql_constraints = [
+        ('date_market_unique', 'UNIQUE(date, market_id)', 'This holiday is already defined for this market!'),
+    ]
+    _order = "date desc"
+
+    name = fields.Char('Holiday', required=True, tracking=True)
+    date = fields.Date('Date', required=True, tracking=True)
+    market_id = fields.Many2one('kst.market', string='Market', ondelete='cascade', tracking=True,
+                                help="Leave empty to close all markets on this date")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._refresh_collection_calendar()
+        return records
+
+    def write(self, vals):
+        calendar_changed = bool({'date', 'market_id'} & set(vals))
+        if calendar_changed:
+            # Reschedule stalls of the markets the holiday is moving away from
+            self._refresh_collection_calendar()
+        result = super().write(vals)
+        if calendar_changed:
+            self._refresh_collection_calendar()
+        return result
+
+    def unlink(self):
+        self._refresh_collection_calendar()
+        return super().unlink()
+
+    def _refresh_collection_calendar(self):
+        """Clear the memoized calendar and reschedule stalls of the affected markets."""
+        if not self:
+            return
+        self.env['kst.collection.calendar']._invalidate_calendar()
+        domain = [('is_active', '=', True)]
+        # A global holiday (no market) reschedules the active stalls of every market
+        if all(record.market_id for record in self):
+            domain.append(('market_id', 'in', self.mapped('market_id').ids))
+        self.env['kst.stall'].search(domain)._schedule_next_payment_date_recompute()
+
+    def name_get(self):
+        result = []
+        for record in self:
+            date_str = record.date.strftime('%Y-%m-%d') if record.date else 'No Date'
+            market = record.market_id.code if record.market_id else 'All Markets'
+            result.append((record.id, f"{date_str} - {record.name} ({market})"))
+        return result
@@ -1,12 +1,24 @@
 from odoo import api, fields, models
+from odoo.tools import split_every
 from odoo.exceptions import ValidationError
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
 
 
 class MarketRentBatch(models.Model):
     _name = 'kst.market.rent.batch'
     _description = 'Market Rent Batch'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.index.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = "collection_date desc, id desc"
+    _indexes = {
+        # Batches of a market by date and type (generation, calendar)
+        'market_date_type': (['market_id', 'collection_date', 'collection_type'], None),
+    }
+
+    # Number of batches whose transactions are inserted per statement (and per commit in cron)
+    _generation_chunk_size = 20
 
     # Grouping: Market + Collection Date + Collection Type
     market_id = fields.Many2one(
@@ -53,11 +65,12 @@ class MarketRentBatch(models.Model):
         'kst.market.rent.transaction',
         'rent_batch_id',
         string='Rent Transactions',
+        context={'active_test': False},
     )
     transaction_count = fields.Integer(
         'Transaction Count',
-        compute='_compute_transaction_count',
-        store=False,
+        compute='_compute_totals',
+        store=True,
     )
 
     # Summary fields
@@ -65,33 +78,53 @@ class MarketRentBatch(models.Model):
         'Total Rent Expected',
         digits=(12, 2),
         compute='_compute_totals',
-        store=False,
+        store=True,
         help="Sum of stall rent for all transactions in this batch (expected amount).",
     )
     total_rent_paid = fields.Float(
         'Total Rent Paid',
         digits=(12, 2),
         compute='_compute_totals',
-        store=False,
+        store=True,
         help="Total rent actually paid for this batch (sum of rent_paid).",
     )
 
-    @api.depends('transaction_ids')
-    def _compute_transaction_count(self):
-        for record in self:
-            record.transaction_count = len(record.transaction_ids)
-
     @api.depends('transaction_ids', 'transaction_ids.rent_paid', 'transaction_ids.rent')
     def _compute_totals(self):
+        # Saved batches are aggregated with a single read_group; batches being
+        # edited in a form (onchange) are summed from their in-memory lines.
+        saved = self.filtered(lambda b: isinstance(b.id, int))
+        totals = {}
+        if saved:
+            groups = self.env['kst.market.rent.transaction'].with_context(active_test=False).read_group(
+                [('rent_batch_id', 'in', saved.ids)],
+                ['rent_batch_id', 'rent:sum', 'rent_paid:sum'],
+                ['rent_batch_id'],
+            )
+            totals = {
+                group['rent_batch_id'][0]: (
+                    group['rent_batch_id_count'],
+                    group['rent'] or 0.0,
+                    group['rent_paid'] or 0.0,
+                )
+                for group in groups
+            }
         for record in self:
-            expected = 0.0
-            paid = 0.0
-            for txn in record.transaction_ids:
-                expected += txn.rent or 0.0
-                paid += txn.rent_paid or 0.0
+            if record in saved:
+                count, expected, paid = totals.get(record.id, (0, 0.0, 0.0))
+            else:
+                count = len(record.transaction_ids)
+                expected = sum(record.transaction_ids.mapped('rent'))
+                paid = sum(record.transaction_ids.mapped('rent_paid'))
+            record.transaction_count = count
             record.total_rent_expected = expected
             record.total_rent_paid = paid
 
+    def _schedule_totals_recompute(self):
+        """Mark the stored totals for recomputation (after SQL inserts of transactions)"""
+        for fname in ('transaction_count', 'total_rent_expected', 'total_rent_paid'):
+            self.env.add_to_compute(self._fields[fname], self)
+
     @api.constrains('collection_date')
     def _check_collection_date(self):
         for record in self:
@@ -101,22 +134,14 @@ class MarketRentBatch(models.Model):
     def _should_pay_on_date(self, stall, date):
         """Check if stall should pay rent on this specific date based on rent_collection_type.
 
-        This mirrors the legacy behavior:
-        - Daily: weekdays (Mon-Fri)
-        - Weekly: specific weekday (use Monday for now)
+        Collection days come from the shared market calendar:
+        - Daily: the market's daily collection days, excluding holidays
+        - Weekly: the market's weekly collection weekday, excluding holidays
         """
         if not stall.rent_collection_type:
             return False
-
-        # Daily: weekdays only
-        if stall.rent_collection_type == 'daily':
-            return date.weekday() < 5  # 0=Mon, 4=Fri
-
-        # Weekly: Mondays (can be adjusted later if needed)
-        if stall.rent_collection_type == 'weekly':
-            return date.weekday() == 0  # Monday
-
-        return False
+        return self.env['kst.collection.calendar']._is_collection_date(
+            stall.market_id.id, stall.rent_collection_type, date)
 
     def action_generate_transactions(self):
         """Generate rent transactions for all active stalls in this market
@@ -134,44 +159,19 @@ class MarketRentBatch(models.Model):
             raise ValidationError("Collection date must be set to generate rent transactions.")
 
         # Find all active stalls in market with matching rent_collection_type
-        stalls = self.env['kst.stall'].search([
+        stall_count = self.env['kst.stall'].search_count([
             ('market_id', '=', self.market_id.id),
             ('rent_collection_type', '=', self.collection_type),
             ('is_active', '=', True),
         ])
 
-        if not stalls:
+        if not stall_count:
             raise ValidationError(
                 f"No active stalls found in market {self.market_id.display_name} "
                 f"with rent collection type '{self.collection_type}'."
             )
 
-        RentTransaction = self.env['kst.market.rent.transaction']
-
-        # Avoid duplicates for the same stall + date + batch
-        existing_txns = RentTransaction.search([
-            ('rent_batch_id', '=', self.id),
-            ('transaction_date', '=', self.collection_date),
-        ])
-        existing_stall_ids = set(existing_txns.mapped('stall_id').ids)
-
-        vals_list = []
-        for stall in stalls:
-            if stall.id in existing_stall_ids:
-                continue
-
-            if not self._should_pay_on_date(stall, self.collection_date):
-                continue
-
-            vals_list.append({
-                'rent_batch_id': self.id,
-                'stall_id': stall.id,
-                'transaction_date': self.collection_date,
-                # Financial fields (rent, COPB) will be encoded by cashier
-            })
-
-        if vals_list:
-            RentTransaction.create(vals_list)
+        self._insert_missing_transactions()
 
         return {
             'type': 'ir.actions.client',
@@ -184,6 +184,203 @@ class MarketRentBatch(models.Model):
             }
         }
 
+    def _insert_missing_transactions(self, commit=False):
+        """Insert the missing rent transactions of these draft batches with set-based SQL.
+
+        One INSERT ... SELECT per chunk of batches: an anti-join against existing
+        transactions picks the (batch, stall) pairs to create, and the stall's
+        market, tenant, collection type and rent are copied in the same statement.
+        Batches whose date is not a collection day of their market are skipped.
+        With ``commit``, each chunk is committed (for long cron runs).
+        Returns the number of transactions created.
+        """
+        calendar = self.env['kst.collection.calendar']
+        batches = self.filtered(
+            lambda b: b.collection_status == 'draft' and calendar._is_collection_date(
+                b.market_id.id, b.collection_type, b.collection_date)
+        )
+        if not batches:
+            return 0
+
+        self.flush(['market_id', 'collection_date', 'collection_type'])
+        self.env['kst.stall'].flush(['market_id', 'tenant_id', 'rent_collection_type',
+                                     'rental_rate', 'is_active'])
+        self.env['kst.market.rent.transaction'].flush(['rent_batch_id', 'stall_id', 'transaction_date'])
+
+        total = len(batches)
+        done = created = 0
+        for batch_ids in split_every(self._generation_chunk_size, batches.ids, tuple):
+            self.env.cr.execute("""
+                INSERT INTO kst_market_rent_transaction
+                       (rent_batch_id, stall_id, transaction_date, verification_status,
+                        market_id, tenant_id, rent_collection_type, rent, active,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT b.id, s.id, b.collection_date, 'pending',
+                       s.market_id, s.tenant_id, s.rent_collection_type, s.rental_rate, TRUE,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM kst_market_rent_batch b
+                  JOIN kst_stall s
+                    ON s.market_id = b.market_id
+                   AND s.rent_collection_type = b.collection_type
+                   AND s.is_active
+                 WHERE b.id IN %(batch_ids)s
+                   AND NOT EXISTS (
+                        SELECT 1
+                          FROM kst_market_rent_transaction t
+                         WHERE t.rent_batch_id = b.id
+                           AND t.stall_id = s.id
+                           AND t.transaction_date = b.collection_date
+                   )
+             RETURNING stall_id, transaction_date
+            """, {'uid': self.env.uid, 'batch_ids': batch_ids})
+            rows = self.env.cr.fetchall()
+            stall_ids = [row[0] for row in rows]
+            created += len(stall_ids)
+
+            # Rows were inserted behind the ORM: refresh caches, COPB ledgers and stall summaries
+            RentTransaction = self.env['kst.market.rent.transaction']
+            RentTransaction.invalidate_cache()
+            from_dates = {}
+            for stall_id, transaction_date in rows:
+                if stall_id not in from_dates or transaction_date < from_dates[stall_id]:
+                    from_dates[stall_id] = transaction_date
+            RentTransaction._recompute_copb(from_dates)
+            stalls = self.env['kst.stall'].browse(set(stall_ids))
+            stalls._rebuild_payment_summary()
+            stalls._schedule_next_payment_date_recompute()
+            stalls.recompute(['next_payment_date'])
+            chunk = self.browse(batch_ids)
+            chunk._schedule_totals_recompute()
+            chunk.recompute()
+
+            done += len(batch_ids)
+            _logger.info("Rent batch generation: %s/%s batches processed, %s transactions created",
+                         done, total, created)
+            if commit:
+                self.env.cr.commit()
+        return created
+
+    @api.model
+    def _generate_batches(self, markets, date_from, date_to, collection_types=('daily', 'weekly'), commit=False):
+        """Open rent batches for every market and collection day in a date range.
+
+        Creates the missing kst.market.rent.batch records (only for market and
+        collection type pairs that have active stalls), then fills every draft
+        batch in the range with _insert_missing_transactions.
+        Returns a dict with the number of batches and transactions created.
+        """
+        calendar = self.env['kst.collection.calendar']
+
+        # Market / collection type pairs that have active stalls (one grouped query)
+        groups = self.env['kst.stall'].read_group(
+            [('market_id', 'in', markets.ids),
+             ('rent_collection_type', 'in', list(collection_types)),
+             ('is_active', '=', True)],
+            ['market_id'], ['market_id', 'rent_collection_type'], lazy=False,
+        )
+        wanted = set()
+        for group in groups:
+            market_id = group['market_id'][0]
+            collection_type = group['rent_collection_type']
+            for day in calendar._get_collection_dates(market_id, collection_type, date_from, date_to):
+                wanted.add((market_id, day, collection_type))
+
+        existing = self.search([
+            ('market_id', 'in', markets.ids),
+            ('collection_date', '>=', date_from),
+            ('collection_date', '<=', date_to),
+            ('collection_type', 'in', list(collection_types)),
+        ])
+        existing_by_key = {
+            (batch.market_id.id, batch.collection_date, batch.collection_type): batch
+            for batch in existing
+        }
+        vals_list = [
+            {'market_id': market_id, 'collection_date': day, 'collection_type': collection_type}
+            for market_id, day, collection_type in sorted(wanted - set(existing_by_key))
+        ]
+        new_batches = self.with_context(mail_create_nolog=True).create(vals_list)
+        _logger.info("Rent batch generation: %s batches created for %s to %s",
+                     len(new_batches), date_from, date_to)
+        if commit:
+            self.env.cr.commit()
+
+        batches = new_batches | existing.filtered(
+            lambda b: (b.market_id.id, b.collection_date, b.collection_type) in wanted)
+        created = batches.sorted('collection_date')._insert_missing_transactions(commit=commit)
+        return {
+            'batches_created': len(new_batches),
+            'transactions_created': created,
+        }
+
+    @api.model
+    def _cron_generate_batches(self):
+        """Open rent batches for all markets from today up to the configured horizon."""
+        days_ahead = int(self.env['ir.config_parameter'].sudo().get_param(
+            'markets.rent_batch_days_ahead', 30))
+        date_from = fields.Date.today()
+        date_to = date_from + timedelta(days=days_ahead)
+        markets = self.env['kst.market'].search([])
+        self._generate_batches(markets, date_from, date_to, commit=True)
+
+    def encode_payments(self, rows):
+        """Bulk-encode cashier collections for this batch in one call.
+
+        ``rows`` is a list of dicts keyed by ``stall_code`` with any of
+        ``rent_paid``, ``copb_paid`` and ``receipt_number`` (``copb_due`` is
+        derived from the stall ledger).
+        Every row is validated first (unknown or duplicated stall codes and the
+        _check_amounts rules); if any row fails, nothing is written and all the
+        errors are reported together. Otherwise all rows are applied without
+        per-field tracking and a single summary is posted on the batch.
+        Returns the number of transactions updated.
+        """
+        self.ensure_one()
+        if self.collection_status == 'verified':
+            raise ValidationError("Payments cannot be encoded on a verified batch.")
+
+        RentTransaction = self.env['kst.market.rent.transaction']
+        encodable = ('rent_paid', 'copb_paid', 'receipt_number')
+        transactions_by_code = {txn.stall_id.code: txn for txn in self.transaction_ids}
+
+        errors = []
+        updates = []
+        seen_codes = set()
+        for index, row in enumerate(rows, start=1):
+            code = (row.get('stall_code') or '').strip()
+            label = f"Row {index} ({code or 'no stall code'})"
+            txn = transactions_by_code.get(code)
+            if not txn:
+                errors.append(f"{label}: stall is not part of this batch.")
+                continue
+            if code in seen_codes:
+                errors.append(f"{label}: stall is encoded more than once.")
+                continue
+            seen_codes.add(code)
+            if txn.verification_status != 'pending':
+                errors.append(f"{label}: transaction is already {txn.verification_status}.")
+                continue
+            vals = {fname: row[fname] for fname in encodable if fname in row}
+            errors.extend(f"{label}: {error}" for error in RentTransaction._get_amount_errors(vals))
+            if vals:
+                updates.append((txn, vals))
+
+        if errors:
+            raise ValidationError("Payments were not encoded:\n" + "\n".join(errors))
+
+        for txn, vals in updates:
+            txn.with_context(tracking_disable=True, copb_recompute_disable=True).write(vals)
+
+        if updates:
+            encoded = self.env['kst.market.rent.transaction'].concat(*(txn for txn, _vals in updates))
+            RentTransaction._recompute_copb(encoded._get_copb_from_dates())
+            self.message_post(body=(
+                f"Encoded {len(updates)} payment(s): "
+                f"rent paid ₱{sum(encoded.mapped('rent_paid')):,.2f}, "
+                f"COPB paid ₱{sum(encoded.mapped('copb_paid')):,.2f}."
+            ))
+        return len(updates)
+
     def action_publish(self):
         """Publish the batch for collection."""
         self.ensure_one()
@@ -200,6 +397,7 @@ class MarketRentBatch(models.Model):
         if self.collection_status != 'published':
             raise ValidationError("Only published batches can be verified.")
         self.collection_status = 'verified'
+        self.env['kst.market.daily.collection.report']._schedule_refresh()
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
@@ -211,6 +409,79 @@ class MarketRentBatch(models.Model):
             }
         }
 
+    def _resync_stall_snapshot(self):
+        """Re-copy the current stall values onto the pending transactions of these open batches.
+
+        Transactions keep the market, tenant, collection type and rent of their
+        stall as of their creation; this is the deliberate, scoped re-sync
+        (one UPDATE) for batches that are not verified yet. Only transactions
+        whose snapshot differs from the stall are touched.
+        Returns the re-synced transactions.
+        """
+        RentTransaction = self.env['kst.market.rent.transaction']
+        snapshot_fields = list(RentTransaction._stall_snapshot_fields)
+        batches = self.filtered(lambda b: b.collection_status != 'verified')
+        if not batches:
+            return RentTransaction
+        RentTransaction.check_access_rights('write')
+        RentTransaction.flush(snapshot_fields + ['stall_id', 'rent_batch_id', 'verification_status'])
+        self.env['kst.stall'].flush(list(RentTransaction._stall_snapshot_fields.values()))
+        self.env.cr.execute("""
+            UPDATE kst_market_rent_transaction t
+               SET market_id = s.market_id,
+                   tenant_id = s.tenant_id,
+                   rent_collection_type = s.rent_collection_type,
+                   rent = s.rental_rate,
+                   write_uid = %(uid)s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+              FROM kst_stall s
+             WHERE s.id = t.stall_id
+               AND t.rent_batch_id IN %(batch_ids)s
+               AND t.verification_status = 'pending'
+               AND (t.market_id, t.tenant_id, t.rent_collection_type, t.rent)
+                   IS DISTINCT FROM (s.market_id, s.tenant_id, s.rent_collection_type, s.rental_rate)
+         RETURNING t.id, t.rent_batch_id
+        """, {'uid': self.env.uid, 'batch_ids': tuple(batches.ids)})
+        rows = self.env.cr.fetchall()
+        transactions = RentTransaction.browse([row[0] for row in rows])
+        if transactions:
+            # Values were written behind the ORM: refresh caches and batch totals
+            RentTransaction.invalidate_cache(snapshot_fields + ['write_uid', 'write_date'], transactions.ids)
+            transactions.modified(snapshot_fields)
+            transactions.recompute()
+            RentTransaction._recompute_copb(transactions._get_copb_from_dates())
+        counts = {}
+        for _txn_id, batch_id in rows:
+            counts[batch_id] = counts.get(batch_id, 0) + 1
+        for batch in batches.filtered(lambda b: b.id in counts):
+            batch.message_post(body=f"Stall data (rent, tenant...) re-synced on {counts[batch.id]} pending transaction(s).")
+        return transactions
+
+    def action_resync_stall_snapshot(self):
+        """Apply the current stall rent and tenant to the pending transactions of these batches"""
+        transactions = self._resync_stall_snapshot()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Stall Data Re-synced',
+                'message': f"{len(transactions)} pending transaction(s) updated from their stall."
+                           if transactions else "Pending transactions already match their stalls.",
+                'type': 'success',
+                'sticky': False,
+            }
+        }
+
+    def action_verify_pending_transactions(self):
+        """Verify every pending transaction of these batches in one update."""
+        pending = self.env['kst.market.rent.transaction'].search([
+            ('rent_batch_id', 'in', self.ids),
+            ('verification_status', '=', 'pending'),
+        ])
+        if not pending:
+            raise ValidationError("There are no pending transactions to verify.")
+        return pending._action_set_verification_status('verified')
+
     def name_get(self):
         """Format batch name as: Market - Date - Collection Type"""
         result = []
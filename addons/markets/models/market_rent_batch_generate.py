@@ -0,0 +1,61 @@
+from odoo import api, fields, models
+from odoo.exceptions import ValidationError
+
+
+class MarketRentBatchGenerate(models.TransientModel):
+    """Wizard to open rent batches for several markets over a date range"""
+    _name = 'kst.market.rent.batch.generate'
+    _description = 'Generate Rent Batches'
+
+    market_ids = fields.Many2many('kst.market', string='Markets', required=True,
+                                  default=lambda self: self.env['kst.market'].search([]))
+    date_from = fields.Date('From', required=True, default=fields.Date.today)
+    date_to = fields.Date('To', required=True)
+    collection_type = fields.Selection([
+        ('all', 'Daily and Weekly'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+    ], string='Collection Type', default='all', required=True)
+
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        for record in self:
+            if record.date_from and record.date_to and record.date_to < record.date_from:
+                raise ValidationError("'To' date cannot be earlier than 'From' date!")
+
+    def action_generate(self):
+        """Create missing batches and their rent transactions for the selected range.
+
+        Opens the batches of the range, or warns when nothing was created.
+        """
+        self.ensure_one()
+        if self.collection_type == 'all':
+            collection_types = ('daily', 'weekly')
+        else:
+            collection_types = (self.collection_type,)
+        result = self.env['kst.market.rent.batch']._generate_batches(
+            self.market_ids, self.date_from, self.date_to, collection_types=collection_types)
+        if not result['batches_created'] and not result['transactions_created']:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': 'Nothing to Generate',
+                    'message': "No rent batch or transaction was created: the selected markets have no "
+                               "active stalls or missing batches on collection days of this range.",
+                    'type': 'warning',
+                    'sticky': False,
+                }
+            }
+        return {
+            'name': 'Rent Batches',
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.market.rent.batch',
+            'view_mode': 'tree,form',
+            'domain': [
+                ('market_id', 'in', self.market_ids.ids),
+                ('collection_date', '>=', self.date_from),
+                ('collection_date', '<=', self.date_to),
+                ('collection_type', 'in', list(collection_types)),
+            ],
+        }
@@ -1,12 +1,26 @@
 from odoo import api, fields, models
 from odoo.exceptions import ValidationError
+from datetime import date, timedelta
 
 
 class MarketRentTransaction(models.Model):
     _name = 'kst.market.rent.transaction'
     _description = 'Market Rent Transaction'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.audit.mixin', 'kst.payment.verification.mixin', 'kst.index.mixin', 'kst.archive.mixin',
+                'mail.thread', 'mail.activity.mixin']
     _order = "transaction_date desc, id desc"
+    _verification_parent_field = 'rent_batch_id'
+    _indexes = {
+        # Transactions of a batch (batch form, generation anti-join, resync)
+        'batch_date': (['rent_batch_id', 'transaction_date'], None),
+        # Rent history of a stall (COPB, stall form)
+        'stall_date': (['stall_id', 'transaction_date'], None),
+        # Pending transactions of a batch (verification, resync) and the pending review list
+        'pending_batch': (['rent_batch_id'], "verification_status = 'pending'"),
+        'pending_date': (['transaction_date DESC', 'id DESC'], "verification_status = 'pending'"),
+        # Default list order over the hot (non-archived) rows only
+        'hot_date': (['transaction_date DESC', 'id DESC'], "active"),
+    }
     
     # Mail.thread automatically adds these fields:
     # - message_ids (One2many to mail.message)
@@ -43,8 +57,12 @@ class MarketRentTransaction(models.Model):
     
     # Financial Fields
     rent_paid = fields.Float('Rent Paid', digits=(12, 2), tracking=True)
-    copb_due = fields.Float('COPB Due', digits=(12, 2), help="Collection on Previous Balance Due", tracking=True)
+    copb_due = fields.Float('COPB Due', digits=(12, 2), readonly=True,
+                            help="Collection on Previous Balance Due: arrears of the stall before this transaction "
+                                 "(derived from the ledger, see _recompute_copb)")
     copb_paid = fields.Float('COPB Paid', digits=(12, 2), help="Collection on Previous Balance Paid", tracking=True)
+    running_balance = fields.Float('Running Balance', digits=(12, 2), readonly=True,
+                                   help="Arrears of the stall after this transaction (negative: paid in advance)")
     
     # Receipt Information
     receipt_number = fields.Char('Receipt Number', tracking=True)
@@ -61,63 +79,235 @@ class MarketRentTransaction(models.Model):
     # Note: Odoo automatically provides create_uid, create_date, write_uid, write_date
     # No need for custom encoded_by/encoded_date fields
     
-    # Related Fields for convenience
-    market_id = fields.Many2one('kst.market', related='stall_id.market_id', string='Market', store=True, readonly=True)
-    tenant_id = fields.Many2one('kst.tenant', related='stall_id.tenant_id', string='Tenant', store=True, readonly=True)
+    # Stall snapshot: copied from the stall when the transaction is created, so
+    # later edits of the stall (rental rate, tenant...) do not rewrite billed
+    # history. Open batches are re-synced on demand by
+    # kst.market.rent.batch._resync_stall_snapshot.
+    market_id = fields.Many2one('kst.market', string='Market', readonly=True)
+    tenant_id = fields.Many2one('kst.tenant', string='Tenant', readonly=True)
     rent_collection_type = fields.Selection([
         ('daily', 'Daily'),
         ('weekly', 'Weekly'),
-    ], related='stall_id.rent_collection_type', string='Rent Collection Type', store=True, readonly=True)
-    rent = fields.Float(related='stall_id.rental_rate', string='Rent', store=True, readonly=True, digits=(12, 2))
+    ], string='Rent Collection Type', readonly=True)
+    rent = fields.Float('Rent', readonly=True, digits=(12, 2),
+                        help="Rental rate of the stall when this transaction was created")
+
+    # snapshot field -> stall field it is copied from
+    _stall_snapshot_fields = {
+        'market_id': 'market_id',
+        'tenant_id': 'tenant_id',
+        'rent_collection_type': 'rent_collection_type',
+        'rent': 'rental_rate',
+    }
 
     @api.depends('attachment_ids')
     def _compute_attachment_count(self):
         for record in self:
             record.attachment_count = len(record.attachment_ids)
 
-    @api.constrains('rent_paid', 'copb_due', 'copb_paid')
+    @api.model
+    def _get_stall_snapshots(self, stall_ids):
+        """Map stall id to the snapshot values of its transactions, read in one query"""
+        stall_ids = list({stall_id for stall_id in stall_ids if stall_id})
+        if not stall_ids:
+            return {}
+        rows = self.env['kst.stall'].browse(stall_ids).read(
+            list(set(self._stall_snapshot_fields.values())), load=None)
+        return {
+            row['id']: {fname: row[stall_fname] for fname, stall_fname in self._stall_snapshot_fields.items()}
+            for row in rows
+        }
+
+    # Running COPB ledger of the stalls %(stall_ids)s, recomputed from their
+    # %(from_dates)s forward in one statement. Each transaction adds its rent
+    # once due (dated up to %(today)s) and subtracts its payments (unless
+    # rejected); a window sum ordered by date carries the balance. The first
+    # recomputed row starts from the stored running balance of the stall's
+    # previous transaction, or from the stall's opening COPB balance. Only rows
+    # whose values change are written.
+    _copb_query = """
+        WITH start AS (
+                SELECT c.stall_id, c.from_date,
+                       COALESCE(prev.running_balance, s.copb_opening_balance, 0) AS opening_balance
+                  FROM unnest(%(stall_ids)s::int[], %(from_dates)s::date[]) AS c(stall_id, from_date)
+                  JOIN kst_stall s ON s.id = c.stall_id
+             LEFT JOIN LATERAL (
+                        SELECT p.running_balance
+                          FROM kst_market_rent_transaction p
+                         WHERE p.stall_id = c.stall_id
+                           AND p.transaction_date < c.from_date
+                      ORDER BY p.transaction_date DESC, p.id DESC
+                         LIMIT 1
+                       ) prev ON TRUE
+        ), movement AS (
+                SELECT t.id, t.stall_id, t.transaction_date, start.opening_balance,
+                       CASE WHEN t.transaction_date <= %(today)s THEN COALESCE(t.rent, 0) ELSE 0 END
+                       - CASE WHEN t.verification_status = 'rejected' THEN 0
+                              ELSE COALESCE(t.rent_paid, 0) + COALESCE(t.copb_paid, 0) END AS amount
+                  FROM kst_market_rent_transaction t
+                  JOIN start ON start.stall_id = t.stall_id AND t.transaction_date >= start.from_date
+        ), ledger AS (
+                SELECT id,
+                       opening_balance + SUM(amount) OVER (
+                           PARTITION BY stall_id ORDER BY transaction_date, id
+                           ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                       ) AS running_balance,
+                       amount
+                  FROM movement
+        )
+        UPDATE kst_market_rent_transaction t
+           SET running_balance = ledger.running_balance,
+               copb_due = GREATEST(ledger.running_balance - ledger.amount, 0)
+          FROM ledger
+         WHERE t.id = ledger.id
+           AND (t.running_balance, t.copb_due) IS DISTINCT FROM
+               (ledger.running_balance, GREATEST(ledger.running_balance - ledger.amount, 0))
+     RETURNING t.id
+    """
+
+    # Fields whose change moves the COPB ledger of the stall
+    _copb_fields = ['stall_id', 'transaction_date', 'rent', 'rent_paid', 'copb_paid', 'verification_status']
+
+    def _get_copb_from_dates(self, from_dates=None):
+        """Map the stall of each record to the earliest transaction date among ``self``.
+
+        Merged into ``from_dates`` when given (earliest date kept).
+        """
+        from_dates = dict(from_dates or {})
+        for record in self:
+            stall_id = record.stall_id.id
+            if stall_id and record.transaction_date:
+                if stall_id not in from_dates or record.transaction_date < from_dates[stall_id]:
+                    from_dates[stall_id] = record.transaction_date
+        return from_dates
+
+    @api.model
+    def _recompute_copb(self, from_dates):
+        """Recompute copb_due and running_balance of stalls from a date forward.
+
+        ``from_dates`` maps a stall id to the date of the earliest changed
+        transaction (``None``: the whole ledger). Earlier transactions are not
+        read, except the one carrying the balance into that date. Returns the
+        transactions whose values changed.
+        """
+        from_dates = {stall_id: from_date for stall_id, from_date in from_dates.items() if stall_id}
+        if not from_dates:
+            return self.browse()
+        self.flush(self._copb_fields + ['running_balance', 'copb_due'])
+        self.env['kst.stall'].flush(['copb_opening_balance'])
+        stall_ids = sorted(from_dates)
+        self.env.cr.execute(self._copb_query, {
+            'stall_ids': stall_ids,
+            'from_dates': [from_dates[stall_id] or date.min for stall_id in stall_ids],
+            'today': fields.Date.today(),
+        })
+        records = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if records:
+            # Values were written behind the ORM: refresh caches and stall summaries
+            self.invalidate_cache(['running_balance', 'copb_due'], records.ids)
+            records.modified(['running_balance', 'copb_due'])
+            records.recompute()
+        return records
+
+    @api.model
+    def _cron_advance_copb(self):
+        """Add the rent that fell due since the last run to the running balances"""
+        params = self.env['ir.config_parameter'].sudo()
+        today = fields.Date.today()
+        last_date = fields.Date.to_date(params.get_param('markets.copb_balance_date')) or today - timedelta(days=1)
+        if last_date >= today:
+            return
+        self.flush(['stall_id', 'transaction_date'])
+        self.env.cr.execute("""
+            SELECT stall_id, MIN(transaction_date)
+              FROM kst_market_rent_transaction
+             WHERE transaction_date > %s
+               AND transaction_date <= %s
+          GROUP BY stall_id
+        """, (last_date, today))
+        self._recompute_copb(dict(self.env.cr.fetchall()))
+        params.set_param('markets.copb_balance_date', fields.Date.to_string(today))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Snapshot the stall values (market, tenant, collection type, rent) on new transactions"""
+        snapshots = self._get_stall_snapshots([vals.get('stall_id') for vals in vals_list])
+        vals_list = [dict(snapshots.get(vals.get('stall_id'), {}), **vals) for vals in vals_list]
+        records = super().create(vals_list)
+        self._recompute_copb(records._get_copb_from_dates())
+        return records
+
+    def write(self, vals):
+        if vals.get('stall_id'):
+            snapshot = self._get_stall_snapshots([vals['stall_id']]).get(vals['stall_id'], {})
+            vals = dict(snapshot, **vals)
+        # Backdated edits recompute the ledger from the edited date forward only
+        # (callers writing many transactions pass copb_recompute_disable and recompute once)
+        from_dates = None
+        if any(fname in vals for fname in self._copb_fields) and not self._context.get('copb_recompute_disable'):
+            from_dates = self._get_copb_from_dates()
+        result = super().write(vals)
+        if from_dates is not None:
+            self._recompute_copb(self._get_copb_from_dates(from_dates))
+        return result
+
+    def unlink(self):
+        from_dates = self._get_copb_from_dates()
+        result = super().unlink()
+        self.browse()._recompute_copb(from_dates)
+        return result
+
+    def _set_verification_status(self, status):
+        # Rejected payments no longer reduce the arrears
+        done, failures = super()._set_verification_status(status)
+        if status == 'rejected':
+            self._recompute_copb(done._get_copb_from_dates())
+        return done, failures
+
+    @api.onchange('stall_id')
+    def _onchange_stall_snapshot(self):
+        """Show the stall values the transaction will be created with"""
+        snapshots = self._get_stall_snapshots(self.stall_id._origin.ids)
+        for record in self:
+            for fname, value in snapshots.get(record.stall_id._origin.id, {}).items():
+                record[fname] = value
+
+    # Amount fields validated by _check_amounts, with their error messages
+    _amount_checks = [
+        ('rent_paid', "Rent paid cannot be negative!"),
+        ('copb_paid', "COPB Paid cannot be negative!"),
+    ]
+
+    @api.model
+    def _get_amount_errors(self, vals):
+        """Return the _check_amounts errors for a dict of amounts (missing keys are skipped)"""
+        errors = []
+        for fname, message in self._amount_checks:
+            value = vals.get(fname)
+            if value is None or value is False:
+                continue
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                errors.append(f"{self._fields[fname].string} must be a number!")
+            elif value < 0:
+                errors.append(message)
+        return errors
+
+    @api.constrains('rent_paid', 'copb_paid')
     def _check_amounts(self):
         for record in self:
-            if record.rent_paid < 0:
-                raise ValidationError("Rent paid cannot be negative!")
-            if record.copb_due < 0:
-                raise ValidationError("COPB Due cannot be negative!")
-            if record.copb_paid < 0:
-                raise ValidationError("COPB Paid cannot be negative!")
+            errors = self._get_amount_errors({
+                fname: record[fname] for fname, _message in self._amount_checks
+            })
+            if errors:
+                raise ValidationError(errors[0])
 
     def action_verify(self):
-        """Verify the payment transaction."""
-        self.ensure_one()
-        if self.verification_status != 'pending':
-            raise ValidationError("Only pending transactions can be verified!")
-        self.verification_status = 'verified'
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Payment Verified',
-                'message': 'The payment has been verified.',
-                'type': 'success',
-                'sticky': False,
-            }
-        }
+        """Verify the selected pending payment transactions."""
+        return self._action_set_verification_status('verified')
 
     def action_reject(self):
-        """Reject the payment transaction."""
-        self.ensure_one()
-        if self.verification_status != 'pending':
-            raise ValidationError("Only pending transactions can be rejected!")
-        self.verification_status = 'rejected'
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Payment Rejected',
-                'message': 'The payment has been rejected.',
-                'type': 'danger',
-                'sticky': False,
-            }
-        }
+        """Reject the selected pending payment transactions."""
+        return self._action_set_verification_status('rejected')
 
     def name_get(self):
         result = []
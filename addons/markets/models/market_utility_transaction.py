@@ -5,14 +5,32 @@ from odoo.exceptions import ValidationError
 class MarketUtilityTransaction(models.Model):
     _name = 'kst.market.utility.transaction'
     _description = 'Market Utility Transaction'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.audit.mixin', 'kst.payment.verification.mixin', 'kst.soa.mixin',
+                'kst.utility.rate.mixin', 'kst.index.mixin', 'kst.archive.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = "transaction_date desc, id desc"
+    _verification_parent_field = 'utility_bill_id'
+    _soa_subject_field = 'stall_id'
+    _soa_billed_to_field = 'tenant_id'
+    _rate_subject_field = 'stall_id'
+    _indexes = {
+        # Transactions of a bill, per stall and utility (generation anti-join, allocation, summary)
+        'bill_stall_type': (['utility_bill_id', 'stall_id', 'utility_type', 'transaction_date'], None),
+        # Utility history of a stall (SOA, repricing, meter carry-forward)
+        'stall_type_date': (['stall_id', 'utility_type', 'transaction_date'], None),
+        # Pending transactions of a bill (verification)
+        'pending_bill': (['utility_bill_id'], "verification_status = 'pending'"),
+        # Default list order over the hot (non-archived) rows only
+        'hot_date': (['transaction_date DESC', 'id DESC'], "active"),
+    }
 
     # Foreign Keys
     stall_id = fields.Many2one('kst.stall', string='Stall', required=True, ondelete='restrict', tracking=True)
     utility_bill_id = fields.Many2one('kst.utility.bill', string='Utility Bill', 
                                      ondelete='restrict', tracking=True,
                                      help="Provider bill (MERALCO/Water) - if metered billing")
+    sheet_id = fields.Many2one('kst.market.utility.sheet', string='Collection Sheet', readonly=True,
+                               ondelete='restrict', index=True,
+                               help="Monthly collection sheet this day was created from (daily flat-rate utilities)")
     
     # Transaction Information
     transaction_date = fields.Date('Transaction Date', required=True, default=fields.Date.today, tracking=True)
@@ -113,45 +131,32 @@ class MarketUtilityTransaction(models.Model):
     @api.onchange('stall_id', 'utility_type')
     def _onchange_stall_set_default_rate(self):
         """Set applied_rate to default rate from stall when stall or utility type changes"""
+        rates = self._get_default_rates(self.stall_id._origin.ids)
         for record in self:
             # Only set if applied_rate is not already set (0 or None)
-            if not record.applied_rate or record.applied_rate == 0:
-                if record.stall_id:
-                    if record.utility_type == 'electricity':
-                        record.applied_rate = record.stall_id.default_electricity_rate or 0.0
-                    elif record.utility_type == 'water':
-                        record.applied_rate = record.stall_id.default_water_rate or 0.0
-                    else:
-                        record.applied_rate = 0.0
-                else:
-                    record.applied_rate = 0.0
+            if not record.applied_rate:
+                record.applied_rate = rates.get(record.stall_id._origin.id, {}).get(record.utility_type, 0.0)
     
     @api.model_create_multi
     def create(self, vals_list):
-        """Set applied_rate to default rate when creating new records"""
-        for vals in vals_list:
-            # Only set if applied_rate is not provided or is 0
-            if 'applied_rate' not in vals or not vals.get('applied_rate') or vals.get('applied_rate') == 0:
-                stall_id = vals.get('stall_id')
-                utility_type = vals.get('utility_type')
-                
-                if stall_id and utility_type:
-                    stall = self.env['kst.stall'].browse(stall_id)
-                    if utility_type == 'electricity':
-                        vals['applied_rate'] = stall.default_electricity_rate or 0.0
-                    elif utility_type == 'water':
-                        vals['applied_rate'] = stall.default_water_rate or 0.0
-        
+        """Set applied_rate to default rate when creating new records (rates read in one query)"""
+        self._set_default_applied_rates(vals_list)
         return super().create(vals_list)
     
     @api.depends('applied_rate', 'consumption', 'previous_reading', 'current_reading', 
-                 'stall_id', 'utility_type', 'is_absent',
-                 'stall_id.default_electricity_rate', 'stall_id.default_water_rate')
+                 'stall_id', 'utility_type', 'is_absent')
     def _compute_amount_due(self):
         """Compute amount due based on consumption × rate (if metered) or flat rate.
         If is_absent is True, amount_due is 0 (excluded from billing).
+        Verified transactions keep their stored amount (frozen history); default
+        stall rate changes reach open transactions through _reprice_open_transactions.
         """
+        frozen = self._get_frozen_amount_due()
         for record in self:
+            if record._origin.id in frozen:
+                record.amount_due = frozen[record._origin.id]
+                continue
+
             # If absent, amount due is 0
             if record.is_absent:
                 record.amount_due = 0.0
@@ -205,12 +210,19 @@ class MarketUtilityTransaction(models.Model):
             else:
                 record.billing_type = 'Flat Rate'
 
+    @api.model
+    def _get_reading_errors(self, previous_reading, current_reading):
+        """Return the _check_readings errors for a pair of meter readings"""
+        if previous_reading and current_reading and current_reading < previous_reading:
+            return ["Current reading cannot be less than previous reading!"]
+        return []
+
     @api.constrains('previous_reading', 'current_reading')
     def _check_readings(self):
         for record in self:
-            if record.previous_reading and record.current_reading:
-                if record.current_reading < record.previous_reading:
-                    raise ValidationError("Current reading cannot be less than previous reading!")
+            errors = self._get_reading_errors(record.previous_reading, record.current_reading)
+            if errors:
+                raise ValidationError(errors[0])
 
     @api.constrains('amount_paid')
     def _check_amount(self):
@@ -219,85 +231,42 @@ class MarketUtilityTransaction(models.Model):
                 raise ValidationError("Amount paid cannot be negative!")
 
     def action_verify(self):
-        """Mark transaction as verified by manager"""
-        self.ensure_one()
-        if self.verification_status != 'pending':
-            raise ValidationError("Only pending transactions can be verified!")
-        self.verification_status = 'verified'
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Transaction Verified',
-                'message': 'Payment has been verified.',
-                'type': 'success',
-                'sticky': False,
-            }
-        }
+        """Mark the selected pending transactions as verified by manager"""
+        return self._action_set_verification_status('verified')
     
     def action_check_bounced(self):
-        """Mark transaction as check bounced"""
-        self.ensure_one()
-        if self.verification_status != 'pending':
-            raise ValidationError("Only pending transactions can be marked as check bounced!")
-        self.verification_status = 'check_bounced'
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Check Bounced',
-                'message': 'Payment has been marked as check bounced.',
-                'type': 'warning',
-                'sticky': False,
-            }
-        }
+        """Mark the selected pending transactions as check bounced"""
+        return self._action_set_verification_status('check_bounced')
     
     def action_reject(self):
-        """Reject the transaction"""
-        self.ensure_one()
-        if self.verification_status != 'pending':
-            raise ValidationError("Only pending transactions can be rejected!")
-        self.verification_status = 'rejected'
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Transaction Rejected',
-                'message': 'Payment has been rejected.',
-                'type': 'warning',
-                'sticky': False,
-            }
-        }
+        """Reject the selected pending transactions"""
+        return self._action_set_verification_status('rejected')
     
+    @api.model
+    def _soa_collect(self, domain):
+        # Days kept on monthly collection sheets are billed on the same statements
+        rows = super()._soa_collect(domain) + self.env['kst.market.utility.sheet']._soa_collect(domain)
+        return sorted(rows, key=lambda row: (row['subject_id'], row['transaction_date'], row['res_model'], row['id']))
+
+    @api.model
+    def _soa_line_description(self, row):
+        if row['res_model'] == 'kst.market.utility.sheet':
+            utility_types = dict(self._fields['utility_type']._description_selection(self.env))
+            return (f"{utility_types.get(row['utility_type'], row['utility_type'] or '')} - "
+                    f"{row['transaction_date'].strftime('%B %Y')} collection sheet")
+        return super()._soa_line_description(row)
+
     def action_generate_soa(self):
-        """Prototype action to 'generate' an SOA for a single transaction.
+        """Generate the Statement of Account of the stalls of these transactions.
 
-        For now, this just raises a client notification. Later this can
-        trigger a report or document generation.
+        The statement covers every underpaid transaction of each stall; an
+        unchanged statement is reused instead of being rendered again.
         """
-        self.ensure_one()
-
-        if not self.soa_issuable:
+        if not any(self.mapped('soa_issuable')):
             # Safety check: don't generate SOA when not underpaid
             raise ValidationError("SOA cannot be generated: this transaction is not underpaid.")
-
-        stall_name = self.stall_id.display_name or 'Stall'
-        date_str = self.transaction_date or 'no date'
-        message = (
-            "SOA can be issued for %s on %s. "
-            "This is a prototype action; hook this into a real report later."
-        ) % (stall_name, date_str)
-
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'SOA Generation (Prototype)',
-                'message': message,
-                'type': 'success',
-                'sticky': False,
-            }
-        }
+        documents, _rendered, _reused = self._soa_generate([('stall_id', 'in', self.stall_id.ids)])
+        return self._soa_open(documents)
 
     def name_get(self):
         result = []
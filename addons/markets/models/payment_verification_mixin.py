@@ -0,0 +1,134 @@
+from collections import defaultdict
+
+from odoo import api, models
+from odoo.exceptions import ValidationError
+
+
+class PaymentVerificationMixin(models.AbstractModel):
+    """Bulk manager review for payment transactions.
+
+    Pending transactions are moved to a new verification status with one
+    conditional UPDATE instead of one tracked write per record. Records that
+    are no longer pending are reported back with the reason, and a single
+    summary note is posted per parent document (rent batch or utility bill).
+
+    Inheriting models set ``_verification_parent_field`` to the Many2one of
+    the document that receives the summary note.
+    """
+    _name = 'kst.payment.verification.mixin'
+    _description = 'Payment Verification Mixin'
+
+    _verification_parent_field = None
+
+    # verification_status -> (past-tense verb, notification type)
+    _verification_labels = {
+        'verified': ('verified', 'success'),
+        'rejected': ('rejected', 'danger'),
+        'check_bounced': ('marked as check bounced', 'warning'),
+    }
+
+    def _set_verification_status(self, status):
+        """Move the pending records of ``self`` to ``status`` in one UPDATE.
+
+        Returns ``(done, failures)``: the updated records and a dict mapping
+        the id of every skipped record to the reason it was skipped.
+        """
+        if not self:
+            return self, {}
+        self.check_access_rights('write')
+        self.check_access_rule('write')
+        self.flush(['verification_status'])
+
+        self.env.cr.execute("""
+            UPDATE %s
+               SET verification_status = %%s,
+                   write_uid = %%s,
+                   write_date = (now() at time zone 'UTC')
+             WHERE id IN %%s
+               AND verification_status = 'pending'
+         RETURNING id
+        """ % self._table, (status, self.env.uid, tuple(self.ids)))
+        done = self.browse([row[0] for row in self.env.cr.fetchall()])
+
+        self.invalidate_cache(['verification_status', 'write_uid', 'write_date'], self.ids)
+        done.modified(['verification_status'])
+
+        skipped = self - done
+        statuses = dict(self._fields['verification_status']._description_selection(self.env))
+        current = {row['id']: row['verification_status']
+                   for row in skipped.exists().read(['verification_status'])}
+        failures = {
+            record.id: (f"already {statuses[current[record.id]]}" if record.id in current
+                        else "record no longer exists")
+            for record in skipped
+        }
+
+        if done:
+            done._log_verification(status)
+            self.env['kst.market.daily.collection.report']._schedule_refresh()
+        return done, failures
+
+    def _log_verification(self, status):
+        """Record a bulk status change: one chatter note per parent document.
+
+        Transactions without a parent get their own note. In compact audit
+        mode every record also gets its kst.audit.log entry.
+        """
+        verb = self._verification_labels[status][0]
+        user = self.env.user.name
+        if self._compact_audit_enabled():
+            self.env['kst.audit.log']._log(self._name, 'write', [
+                (res_id, {'verification_status': ['pending', status]}) for res_id in self.ids
+            ])
+
+        by_parent = defaultdict(list)
+        orphan_ids = []
+        for record in self:
+            parent = record[self._verification_parent_field] if self._verification_parent_field else None
+            if parent:
+                by_parent[parent].append(record.stall_id.code or str(record.id))
+            else:
+                orphan_ids.append(record.id)
+        for parent, codes in by_parent.items():
+            names = ', '.join(codes[:20]) + (', ...' if len(codes) > 20 else '')
+            parent.message_post(body=f"{len(codes)} payment(s) {verb} by {user}: {names}")
+        for record in self.browse(orphan_ids):
+            record.message_post(body=f"Payment {verb} by {user}.")
+
+    def _action_set_verification_status(self, status):
+        """Button/server action wrapper around _set_verification_status.
+
+        Raises when nothing could be updated; otherwise returns a notification
+        summarizing the updated records and listing the skipped ones.
+        """
+        verb, notification_type = self._verification_labels[status]
+        done, failures = self._set_verification_status(status)
+        names = dict(self.browse(list(failures)).exists().name_get())
+        reasons = [f"{names.get(res_id, f'#{res_id}')}: {reason}" for res_id, reason in failures.items()]
+        if not done:
+            message = f"Only pending transactions can be {verb}!"
+            if len(self) > 1:
+                message += "\n" + "\n".join(reasons)
+            raise ValidationError(message)
+
+        message = f"{len(done)} payment(s) {verb}."
+        if reasons:
+            message += f" {len(reasons)} skipped:\n" + "\n".join(reasons[:10])
+            if len(reasons) > 10:
+                message += f"\n... and {len(reasons) - 10} more"
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': f"Payments {verb.capitalize()}",
+                'message': message,
+                'type': notification_type if not reasons else 'warning',
+                'sticky': bool(reasons),
+            }
+        }
+
+    @api.model
+    def _set_verification_status_domain(self, domain, status):
+        """Mass review: apply ``status`` to every pending transaction matching ``domain``."""
+        records = self.search(domain + [('verification_status', '=', 'pending')])
+        return records._set_verification_status(status)
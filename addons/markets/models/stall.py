@@ -1,23 +1,30 @@
 from odoo import api, fields, models
-from odoo.exceptions import ValidationError
-from datetime import timedelta
 
 
 class Stall(models.Model):
     _name = 'kst.stall'
     _description = 'Market Stall'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.index.mixin', 'mail.thread', 'mail.activity.mixin']
+    _indexes = {
+        # Active stalls of a market by collection type (rent batch generation)
+        'active_market_collection': (['market_id', 'rent_collection_type'], "is_active"),
+        # Stalls with arrears
+        'arrears': (['market_id', 'total_copb_due'], "total_copb_due > 0"),
+    }
+    _sql_constraints = [
+        ('code_market_unique', 'UNIQUE(market_id, code)', 'Stall code must be unique per market!'),
+    ]
     _order = "market_id, code"
 
     # Foreign Keys
     market_id = fields.Many2one('kst.market', string='Market', required=True, ondelete='restrict', tracking=True)
     tenant_id = fields.Many2one('kst.tenant', string='Tenant', ondelete='restrict', tracking=True)
     electricity_utility_account_id = fields.Many2one('kst.utility.account', string='Electricity Utility Account', 
-                                        ondelete='restrict', tracking=True,
+                                        ondelete='restrict', tracking=True, index=True,
                                         domain=[('utility_type', '=', 'electricity')],
                                         help="Electricity utility account (MERALCO) for metered billing")
     water_utility_account_id = fields.Many2one('kst.utility.account', string='Water Utility Account', 
-                                        ondelete='restrict', tracking=True,
+                                        ondelete='restrict', tracking=True, index=True,
                                         domain=[('utility_type', '=', 'water')],
                                         help="Water utility account for metered billing")
     electric_pay_type_id = fields.Many2one('kst.market.pay.type', string='Electric Pay Type',
@@ -28,6 +35,8 @@ class Stall(models.Model):
     # Basic Fields
     code = fields.Char('Stall Code', required=True, tracking=True)
     rental_rate = fields.Float('Rental Rate', digits=(12, 2), tracking=True)
+    copb_opening_balance = fields.Float('Opening COPB Balance', digits=(12, 2), tracking=True,
+                                        help="Arrears carried over from before the first rent transaction")
     default_electricity_rate = fields.Float('Default Electricity Rate', digits=(12, 2), tracking=True,
                                            help="Flat rate used when not metered")
     default_water_rate = fields.Float('Default Water Rate', digits=(12, 2), tracking=True,
@@ -47,23 +56,28 @@ class Stall(models.Model):
     display_name = fields.Char('Display Name', compute='_compute_display_name', store=True)
     
     # One2many relationships
-    rent_transaction_ids = fields.One2many('kst.market.rent.transaction', 'stall_id', string='Rent Transactions')
-    utility_transaction_ids = fields.One2many('kst.market.utility.transaction', 'stall_id', string='Utility Transactions')
+    # (archived transactions included: they are part of the stall history)
+    rent_transaction_ids = fields.One2many('kst.market.rent.transaction', 'stall_id', string='Rent Transactions',
+                                           context={'active_test': False})
+    utility_transaction_ids = fields.One2many('kst.market.utility.transaction', 'stall_id',
+                                              string='Utility Transactions', context={'active_test': False})
     
     # Payment Ledger (verified transactions)
     ledger_transaction_ids = fields.One2many('kst.market.rent.transaction', 'stall_id', 
                                              string='Payment Ledger', 
                                              domain=[('verification_status', '=', 'verified')],
+                                             context={'active_test': False},
                                              readonly=True)
     
-    # Computed fields for payment summary
-    total_paid = fields.Float('Total Paid', compute='_compute_payment_summary', store=False)
-    total_copb_due = fields.Float('Total COPB Due', compute='_compute_payment_summary', store=False)
-    last_payment_date = fields.Date('Last Payment Date', compute='_compute_payment_summary', store=False)
-    next_payment_date = fields.Date('Next Payment Date', compute='_compute_next_payment_date', store=False)
+    # Payment summary (stored, aggregated in SQL from rent transactions)
+    total_paid = fields.Float('Total Paid', compute='_compute_payment_summary', store=True)
+    total_copb_due = fields.Float('Total COPB Due', compute='_compute_payment_summary', store=True)
+    last_payment_date = fields.Date('Last Payment Date', compute='_compute_payment_summary', store=True)
+    next_payment_date = fields.Date('Next Payment Date', compute='_compute_next_payment_date', store=True,
+                                    help="Refreshed daily by a scheduled action so overdue dates roll forward")
     ledger_count = fields.Integer('Ledger Count', compute='_compute_ledger_count', store=False)
     
-    # Scheduled Payments (One2many to transient model)
+    # Scheduled Payments (One2many to read-only SQL view)
     scheduled_payment_ids = fields.One2many('kst.stall.scheduled.payment', 'stall_id', 
                                            string='Scheduled Payments', 
                                            readonly=True)
@@ -78,218 +92,160 @@ class Stall(models.Model):
             else:
                 record.display_name = 'New Stall'
 
-    @api.constrains('code', 'market_id')
-    def _check_code_unique_per_market(self):
-        for record in self:
-            if record.code and record.market_id:
-                existing = self.search([
-                    ('code', '=', record.code),
-                    ('market_id', '=', record.market_id.id),
-                    ('id', '!=', record.id)
-                ])
-                if existing:
-                    raise ValidationError(f"Stall code '{record.code}' already exists in market '{record.market_id.name}'!")
+    # Per-stall payment summary aggregated from rent transactions:
+    # total_paid sums rent_paid, total_copb_due is the running balance of the
+    # most recent transaction (see kst.market.rent.transaction._recompute_copb)
+    # and last_payment_date the date of the most recent one with rent_paid > 0.
+    _payment_summary_query = """
+        SELECT agg.stall_id, agg.total_paid, latest.copb_due, agg.last_payment_date
+          FROM (
+                SELECT stall_id,
+                       SUM(COALESCE(rent_paid, 0)) AS total_paid,
+                       MAX(transaction_date) FILTER (WHERE rent_paid > 0) AS last_payment_date
+                  FROM kst_market_rent_transaction
+                 WHERE stall_id IN %(stall_ids)s
+              GROUP BY stall_id
+               ) agg
+          JOIN (
+                SELECT DISTINCT ON (stall_id) stall_id, GREATEST(COALESCE(running_balance, 0), 0) AS copb_due
+                  FROM kst_market_rent_transaction
+                 WHERE stall_id IN %(stall_ids)s
+              ORDER BY stall_id, transaction_date DESC, id DESC
+               ) latest ON latest.stall_id = agg.stall_id
+    """
+
+    def _flush_rent_transactions(self):
+        self.env['kst.market.rent.transaction'].flush(
+            ['stall_id', 'transaction_date', 'rent_paid', 'running_balance'])
 
-    @api.depends('rent_transaction_ids', 
-                 'rent_transaction_ids.rent_paid', 'rent_transaction_ids.copb_due',
+    @api.depends('rent_transaction_ids',
+                 'rent_transaction_ids.rent_paid', 'rent_transaction_ids.running_balance',
                  'rent_transaction_ids.transaction_date')
     def _compute_payment_summary(self):
+        # One grouped query for the whole batch instead of loading every transaction
+        stall_ids = tuple(sid for sid in self._origin.ids if sid)
+        summary = {}
+        if stall_ids:
+            self._flush_rent_transactions()
+            self.env.cr.execute(self._payment_summary_query, {'stall_ids': stall_ids})
+            summary = {row[0]: row[1:] for row in self.env.cr.fetchall()}
         for record in self:
-            # Sum all rent_paid amounts (no payment_status filter)
-            record.total_paid = sum(record.rent_transaction_ids.mapped('rent_paid'))
-            
-            # Get latest COPB Due from most recent transaction
-            if record.rent_transaction_ids:
-                latest_trans = record.rent_transaction_ids.sorted('transaction_date', reverse=True)[0]
-                record.total_copb_due = latest_trans.copb_due
-            else:
-                record.total_copb_due = 0.0
-            
-            # Get last payment date (from transactions with rent_paid > 0)
-            transactions_with_payment = record.rent_transaction_ids.filtered(
-                lambda t: t.rent_paid and t.rent_paid > 0
-            )
-            if transactions_with_payment:
-                record.last_payment_date = max(transactions_with_payment.mapped('transaction_date'))
-            else:
-                record.last_payment_date = False
-    
+            total_paid, copb_due, last_date = summary.get(record._origin.id, (0.0, 0.0, False))
+            record.total_paid = total_paid
+            record.total_copb_due = copb_due
+            record.last_payment_date = last_date or False
+
+    def _rebuild_payment_summary(self):
+        """Rebuild the stored payment summary of these stalls with a single UPDATE.
+
+        Use after bulk SQL loads of rent transactions, which bypass the ORM
+        dependencies that normally keep the summary current.
+        """
+        if not self:
+            return
+        self._flush_rent_transactions()
+        self.flush(['total_paid', 'total_copb_due', 'last_payment_date'])
+        self.env.cr.execute("""
+            UPDATE kst_stall s
+               SET total_paid = COALESCE(summary.total_paid, 0),
+                   total_copb_due = COALESCE(summary.copb_due, 0),
+                   last_payment_date = summary.last_payment_date
+              FROM kst_stall target
+         LEFT JOIN (%s) summary ON summary.stall_id = target.id
+             WHERE target.id IN %%(stall_ids)s
+               AND s.id = target.id
+        """ % self._payment_summary_query, {'stall_ids': tuple(self.ids)})
+        self.invalidate_cache(['total_paid', 'total_copb_due', 'last_payment_date'], self.ids)
+
     @api.depends('ledger_transaction_ids')
     def _compute_ledger_count(self):
         for record in self:
             record.ledger_count = len(record.ledger_transaction_ids)
     
-    @api.depends('rent_collection_type', 'rent_transaction_ids.transaction_date', 'is_active')
+    def _get_last_transaction_dates(self):
+        """Return a dict mapping stall id to its latest rent transaction date (one GROUP BY)."""
+        stall_ids = tuple(sid for sid in self._origin.ids if sid)
+        if not stall_ids:
+            return {}
+        self.env['kst.market.rent.transaction'].flush(['stall_id', 'transaction_date'])
+        self.env.cr.execute("""
+            SELECT stall_id, MAX(transaction_date)
+              FROM kst_market_rent_transaction
+             WHERE stall_id IN %s
+          GROUP BY stall_id
+        """, (stall_ids,))
+        return dict(self.env.cr.fetchall())
+
+    @api.depends('rent_collection_type', 'rent_transaction_ids.transaction_date', 'is_active',
+                 'market_id', 'market_id.daily_collection_days', 'market_id.collection_weekday')
     def _compute_next_payment_date(self):
         today = fields.Date.today()
+        last_dates = self._get_last_transaction_dates()
         for record in self:
             if not record.is_active or not record.rent_collection_type:
                 record.next_payment_date = False
                 continue
-            
-            # Get last transaction date
-            if record.rent_transaction_ids:
-                last_date = max(record.rent_transaction_ids.mapped('transaction_date'))
-            else:
-                # If no transactions, start from today
-                last_date = today
-            
-            # Calculate next payment date based on collection type
-            if record.rent_collection_type == 'daily':
-                # Next weekday (skip weekends)
-                next_date = last_date + timedelta(days=1)
-                while next_date.weekday() >= 5:  # Saturday=5, Sunday=6
-                    next_date += timedelta(days=1)
-                record.next_payment_date = next_date
-            elif record.rent_collection_type == 'weekly':
-                # Next week (same day of week)
-                record.next_payment_date = last_date + timedelta(days=7)
-            else:  # monthly
-                # Next month - add 32 days then set to first of that month, then add the day
-                # This handles month-end edge cases
-                year = last_date.year
-                month = last_date.month
-                day = last_date.day
-                if month == 12:
-                    next_year = year + 1
-                    next_month = 1
-                else:
-                    next_year = year
-                    next_month = month + 1
-                # Try to create the date, if it fails (e.g., Jan 31 -> Feb), use last day of month
-                try:
-                    record.next_payment_date = fields.Date.to_date(f"{next_year}-{next_month:02d}-{day:02d}")
-                except:
-                    # Get last day of next month
-                    if next_month == 12:
-                        last_day_month = fields.Date.to_date(f"{next_year+1}-01-01") - timedelta(days=1)
-                    else:
-                        last_day_month = fields.Date.to_date(f"{next_year}-{next_month+1:02d}-01") - timedelta(days=1)
-                    record.next_payment_date = last_day_month
-            
+
+            # If no transactions, start from today
+            last_date = last_dates.get(record._origin.id) or today
+            next_date = record._calculate_next_payment_date(last_date)
+
             # If next payment date is in the past, calculate from today
-            if record.next_payment_date and record.next_payment_date < today:
-                if record.rent_collection_type == 'daily':
-                    next_date = today + timedelta(days=1)
-                    while next_date.weekday() >= 5:
-                        next_date += timedelta(days=1)
-                    record.next_payment_date = next_date
-                elif record.rent_collection_type == 'weekly':
-                    record.next_payment_date = today + timedelta(days=7)
-                else:  # monthly
-                    year = today.year
-                    month = today.month
-                    day = today.day
-                    if month == 12:
-                        next_year = year + 1
-                        next_month = 1
-                    else:
-                        next_year = year
-                        next_month = month + 1
-                    try:
-                        record.next_payment_date = fields.Date.to_date(f"{next_year}-{next_month:02d}-{day:02d}")
-                    except:
-                        if next_month == 12:
-                            last_day_month = fields.Date.to_date(f"{next_year+1}-01-01") - timedelta(days=1)
-                        else:
-                            last_day_month = fields.Date.to_date(f"{next_year}-{next_month+1:02d}-01") - timedelta(days=1)
-                        record.next_payment_date = last_day_month
+            if not next_date or next_date < today:
+                next_date = record._calculate_next_payment_date(today)
+            record.next_payment_date = next_date
 
-    
-    def _generate_scheduled_payments(self):
-        """Generate scheduled payment records for the next 12 payment periods"""
-        ScheduledPayment = self.env['kst.stall.scheduled.payment']
-        today = fields.Date.today()
-        
-        for record in self:
-            # Clear existing scheduled payments for this stall
-            existing = ScheduledPayment.search([('stall_id', '=', record.id)])
-            existing.unlink()
-            
-            if not record.is_active or not record.rent_collection_type or not record.rental_rate:
-                continue
-            
-            # Determine starting date
-            if record.next_payment_date and record.next_payment_date >= today:
-                start_date = record.next_payment_date
-            elif record.rent_transaction_ids:
-                # Calculate from last transaction
-                last_date = max(record.rent_transaction_ids.mapped('transaction_date'))
-                start_date = self._calculate_next_payment_date(last_date, record.rent_collection_type)
-            else:
-                # No transactions, start from today
-                start_date = self._calculate_next_payment_date(today, record.rent_collection_type)
-            
-            # Generate next 12 scheduled payments
-            scheduled_payments = []
-            current_date = start_date
-            num_payments = 12
-            
-            for i in range(num_payments):
-                if current_date < today:
-                    current_date = self._calculate_next_payment_date(today, record.rent_collection_type)
-                
-                scheduled_payments.append({
-                    'stall_id': record.id,
-                    'scheduled_date': current_date,
-                    'expected_amount': record.rental_rate,
-                    'rent_collection_type': record.rent_collection_type,
-                    'status': 'Pending',
-                })
-                
-                # Calculate next payment date
-                current_date = self._calculate_next_payment_date(current_date, record.rent_collection_type)
-            
-            # Create the records
-            if scheduled_payments:
-                ScheduledPayment.create(scheduled_payments)
-    
-    def action_generate_scheduled_payments(self):
-        """Button action to manually regenerate scheduled payments"""
-        self._generate_scheduled_payments()
+    def _schedule_next_payment_date_recompute(self):
+        """Mark next_payment_date for recomputation (e.g. after a calendar change)"""
+        if self:
+            self.env.add_to_compute(self._fields['next_payment_date'], self)
+
+    @api.model
+    def _cron_refresh_next_payment_date(self):
+        """Roll stored next payment dates that fell in the past forward from today."""
+        stalls = self.search([
+            ('is_active', '=', True),
+            ('next_payment_date', '<', fields.Date.today()),
+        ])
+        if stalls:
+            stalls._schedule_next_payment_date_recompute()
+            stalls.recompute(['next_payment_date'])
+
+    def _get_scheduled_payments(self, horizon=None, collection_type=None):
+        """Upcoming dues of these stalls, computed in a single query without writing anything"""
+        return self.env['kst.stall.scheduled.payment']._read_schedule(
+            stalls=self, horizon=horizon, collection_type=collection_type)
+
+    def action_view_scheduled_payments(self):
+        """Action to view upcoming scheduled payments"""
         return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Scheduled Payments',
-                'message': 'Scheduled payments have been generated.',
-                'type': 'success',
-                'sticky': False,
-            }
+            'name': 'Scheduled Payments',
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.stall.scheduled.payment',
+            'view_mode': 'tree',
+            'domain': [('stall_id', 'in', self.ids)],
         }
     
-    def _calculate_next_payment_date(self, from_date, collection_type):
-        """Helper method to calculate next payment date from a given date"""
-        if collection_type == 'daily':
-            # Next weekday (skip weekends)
-            next_date = from_date + timedelta(days=1)
-            while next_date.weekday() >= 5:  # Saturday=5, Sunday=6
-                next_date += timedelta(days=1)
-            return next_date
-        elif collection_type == 'weekly':
-            # Next week (same day of week)
-            return from_date + timedelta(days=7)
-        else:  # monthly
-            # Next month
-            year = from_date.year
-            month = from_date.month
-            day = from_date.day
-            if month == 12:
-                next_year = year + 1
-                next_month = 1
-            else:
-                next_year = year
-                next_month = month + 1
-            # Try to create the date, if it fails (e.g., Jan 31 -> Feb), use last day of month
-            try:
-                return fields.Date.to_date(f"{next_year}-{next_month:02d}-{day:02d}")
-            except:
-                # Get last day of next month
-                if next_month == 12:
-                    last_day_month = fields.Date.to_date(f"{next_year+1}-01-01") - timedelta(days=1)
-                else:
-                    last_day_month = fields.Date.to_date(f"{next_year}-{next_month+1:02d}-01") - timedelta(days=1)
-                return last_day_month
+    def _calculate_next_payment_date(self, from_date):
+        """Next collection date of this stall after a given date, from the market calendar"""
+        self.ensure_one()
+        return self.env['kst.collection.calendar']._next_collection_date(
+            self.market_id.id, self.rent_collection_type, from_date)
+
+    def write(self, vals):
+        """Apply default rate changes to open utility transactions and sheets only (verified history is frozen).
+
+        A new opening COPB balance recomputes the whole rent ledger of the stall.
+        """
+        Transaction = self.env['kst.market.utility.transaction']
+        rate_changes = Transaction._get_rate_changes(self, vals)
+        result = super().write(vals)
+        Transaction._reprice_open_transactions(rate_changes)
+        self.env['kst.market.utility.sheet']._reprice_open_transactions(rate_changes)
+        if 'copb_opening_balance' in vals:
+            # The opening balance moves the whole COPB ledger
+            self.env['kst.market.rent.transaction']._recompute_copb(dict.fromkeys(self.ids))
+        return result
 
     def name_get(self):
         result = []
@@ -310,7 +266,7 @@ class Stall(models.Model):
             'res_model': 'kst.market.rent.transaction',
             'view_mode': 'tree,form',
             'domain': [('stall_id', '=', self.id), ('verification_status', '=', 'verified')],
-            'context': {'default_stall_id': self.id},
+            'context': {'default_stall_id': self.id, 'active_test': False},
         }
     
 
@@ -1,22 +1,130 @@
-from odoo import api, fields, models
-from datetime import timedelta
+from odoo import api, fields, models, tools
 
 
-class StallScheduledPayment(models.TransientModel):
-    """Transient model to display scheduled future payments for a stall"""
+class StallScheduledPayment(models.Model):
+    """Read-only SQL view listing the upcoming rent dues of active stalls.
+
+    Rows are projected on the fly with generate_series from the stall's stored
+    next_payment_date, so nothing is ever written to build the forecast.
+    """
     _name = 'kst.stall.scheduled.payment'
     _description = 'Stall Scheduled Payment'
-    _order = 'scheduled_date'
+    _auto = False
+    _order = 'scheduled_date, stall_id'
+
+    # Number of upcoming payment periods exposed by the view
+    _default_horizon = 12
+    # Row ids are stall_id * 1000 + sequence, so a stall has at most 999 periods
+    _max_horizon = 999
 
-    stall_id = fields.Many2one('kst.stall', string='Stall', required=True, ondelete='cascade')
-    scheduled_date = fields.Date('Scheduled Date', required=True)
-    expected_amount = fields.Float('Expected Amount', digits=(12, 2), required=True)
+    stall_id = fields.Many2one('kst.stall', string='Stall', readonly=True)
+    market_id = fields.Many2one('kst.market', string='Market', readonly=True)
+    tenant_id = fields.Many2one('kst.tenant', string='Tenant', readonly=True)
+    sequence = fields.Integer('Period', readonly=True)
+    scheduled_date = fields.Date('Scheduled Date', readonly=True)
+    expected_amount = fields.Float('Expected Amount', digits=(12, 2), readonly=True)
     rent_collection_type = fields.Selection([
         ('daily', 'Daily'),
         ('weekly', 'Weekly'),
         ('monthly', 'Monthly'),
-    ], string='Collection Type', required=True)
-    status = fields.Char('Status', default='Pending', readonly=True)
+    ], string='Collection Type', readonly=True)
+    status = fields.Char('Status', readonly=True)
+
+    @api.model
+    def _query(self, horizon=None, where=''):
+        """SQL projecting the next ``horizon`` payment dates of each active stall.
+
+        Follows the collection calendar: daily stalls pay on the market's daily
+        collection days, weekly stalls every 7 days from their next payment date,
+        and market holidays are skipped. ``where`` is appended to the stall
+        filter and may use query parameters. ``horizon`` is capped at
+        _max_horizon to keep the row ids unique.
+        """
+        horizon = min(int(horizon or self._default_horizon), self._max_horizon)
+        return """
+            WITH stall AS (
+                SELECT s.id AS stall_id,
+                       s.market_id,
+                       s.tenant_id,
+                       s.rental_rate,
+                       s.rent_collection_type,
+                       CASE m.daily_collection_days
+                            WHEN 'mon_sat' THEN 6
+                            WHEN 'all' THEN 7
+                            ELSE 5
+                       END AS last_isodow,
+                       GREATEST(COALESCE(s.next_payment_date, CURRENT_DATE), CURRENT_DATE) AS start_date
+                  FROM kst_stall s
+                  JOIN kst_market m ON m.id = s.market_id
+                 WHERE s.is_active
+                   AND s.rent_collection_type IS NOT NULL
+                   AND COALESCE(s.rental_rate, 0) > 0
+                   %(where)s
+            ), schedule AS (
+                SELECT st.*,
+                       d::date AS scheduled_date,
+                       ROW_NUMBER() OVER (PARTITION BY st.stall_id ORDER BY d) AS sequence
+                  FROM stall st
+            CROSS JOIN LATERAL generate_series(
+                           st.start_date::timestamp,
+                           -- enough calendar days to hold %(horizon)s collection days plus holidays
+                           CASE WHEN st.rent_collection_type = 'weekly'
+                                THEN st.start_date + 7 * (%(horizon)s + 4)
+                                ELSE st.start_date + 7 * (%(horizon)s / 5 + 3)
+                           END::timestamp,
+                           CASE WHEN st.rent_collection_type = 'weekly'
+                                THEN interval '7 days' ELSE interval '1 day'
+                           END) d
+                 WHERE (st.rent_collection_type = 'weekly' OR EXTRACT(ISODOW FROM d) <= st.last_isodow)
+                   AND NOT EXISTS (
+                        SELECT 1
+                          FROM kst_market_holiday h
+                         WHERE h.date = d::date
+                           AND (h.market_id IS NULL OR h.market_id = st.market_id)
+                   )
+            )
+            SELECT stall_id::bigint * 1000 + sequence AS id,
+                   stall_id,
+                   market_id,
+                   tenant_id,
+                   sequence,
+                   scheduled_date,
+                   rental_rate AS expected_amount,
+                   rent_collection_type,
+                   'Pending'::varchar AS status
+              FROM schedule
+             WHERE sequence <= %(horizon)s
+        """ % {'horizon': horizon, 'where': where}
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("CREATE OR REPLACE VIEW %s AS (%s)" % (self._table, self._query()))
+
+    @api.model
+    def _read_schedule(self, stalls=None, horizon=None, collection_type=None):
+        """Return the upcoming dues of ``stalls`` (all active stalls when None) in one query.
+
+        Result is a list of dicts ordered by stall and date; nothing is written.
+        """
+        where, params = '', {}
+        if stalls is not None:
+            if not stalls:
+                return []
+            where += ' AND s.id IN %(stall_ids)s'
+            params['stall_ids'] = tuple(stalls.ids)
+        if collection_type:
+            where += ' AND s.rent_collection_type = %(collection_type)s'
+            params['collection_type'] = collection_type
+        self.env['kst.stall'].flush(['is_active', 'rent_collection_type', 'rental_rate',
+                                     'next_payment_date', 'market_id', 'tenant_id'])
+        self.env['kst.market'].flush(['daily_collection_days'])
+        self.env['kst.market.holiday'].flush(['date', 'market_id'])
+        self.env.cr.execute(
+            "SELECT * FROM (%s) schedule ORDER BY stall_id, scheduled_date"
+            % self._query(horizon=horizon, where=where),
+            params,
+        )
+        return self.env.cr.dictfetchall()
 
     def name_get(self):
         result = []
@@ -25,4 +133,3 @@ class StallScheduledPayment(models.TransientModel):
             name = f"{date_str} - ₱{record.expected_amount:,.2f}"
             result.append((record.id, name))
         return result
-
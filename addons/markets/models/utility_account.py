@@ -15,20 +15,35 @@ class UtilityAccount(models.Model):
     utility_bill_ids = fields.One2many('kst.utility.bill', 'utility_account_id', string='Utility Bills', readonly=True)
     utility_bill_count = fields.Integer('Utility Bill Count', compute='_compute_utility_bill_count', store=False)
     
-    @api.depends('electricity_stall_ids', 'water_stall_ids')
+    # utility_type -> stall field linking the stall to its utility account
+    _stall_account_fields = {
+        'electricity': 'electricity_utility_account_id',
+        'water': 'water_utility_account_id',
+    }
+
+    def _get_stall_counts(self, domain=None):
+        """Map account id to its number of stalls matching ``domain`` (one grouped count per utility type)"""
+        counts = {}
+        for utility_type, fname in self._stall_account_fields.items():
+            accounts = self._origin.filtered(lambda a: a.utility_type == utility_type)
+            if accounts:
+                groups = self.env['kst.stall'].read_group(
+                    [(fname, 'in', accounts.ids)] + (domain or []), [fname], [fname])
+                counts.update({group[fname][0]: group[f'{fname}_count'] for group in groups})
+        return counts
+
+    @api.depends('utility_type', 'electricity_stall_ids', 'water_stall_ids')
     def _compute_stall_count(self):
+        counts = self._get_stall_counts()
         for record in self:
-            # Count stalls based on utility type
-            if record.utility_type == 'electricity':
-                record.stall_count = len(record.electricity_stall_ids)
-            elif record.utility_type == 'water':
-                record.stall_count = len(record.water_stall_ids)
-            else:
-                record.stall_count = 0
+            record.stall_count = counts.get(record._origin.id, 0)
     
     @api.depends('utility_bill_ids')
     def _compute_utility_bill_count(self):
+        counts = {}
+        if self._origin:
+            groups = self.env['kst.utility.bill'].read_group(
+                [('utility_account_id', 'in', self._origin.ids)], ['utility_account_id'], ['utility_account_id'])
+            counts = {group['utility_account_id'][0]: group['utility_account_id_count'] for group in groups}
         for record in self:
-            record.utility_bill_count = len(record.utility_bill_ids)
-
-
+            record.utility_bill_count = counts.get(record._origin.id, 0)
@@ -1,17 +1,111 @@
 from odoo import api, fields, models
+from odoo.tools import date_utils, split_every
 from odoo.exceptions import ValidationError
-from datetime import timedelta
+from collections import defaultdict
+import logging
+
+_logger = logging.getLogger(__name__)
 
 
 class UtilityBill(models.Model):
     _name = 'kst.utility.bill'
     _description = 'Utility Bill'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.index.mixin', 'kst.meter.carry.forward.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = "bill_date desc, id desc"
+    _indexes = {
+        # "Underpaid bills of a period" reads only the underpaid rows
+        'underpayment': (['bill_date'], "has_underpayment"),
+    }
+    _carry_transaction_model = 'kst.market.utility.transaction'
+    _carry_subject_field = 'stall_id'
+
+    # Candidate transaction rows inserted per SQL statement when generating
+    _generation_chunk_size = 5000
+
+    # Allocates the bills of %(bill_ids)s over their pending, non-absent
+    # transactions (only rows with consumption, except for flat split) in one
+    # statement. Verified transactions keep their frozen amounts and take no share.
+    # Shares are computed with window aggregates per bill; for loss sharing and
+    # flat split the rounding remainder goes to the largest share so the
+    # allocated total matches the bill amount exactly.
+    _allocation_query = """
+        WITH line AS (
+                SELECT t.id, t.utility_bill_id AS bill_id, t.stall_id,
+                       COALESCE(t.consumption, 0) AS consumption,
+                       b.allocation_method AS method,
+                       b.total_bill_amount AS bill_amount,
+                       b.derived_rate
+                  FROM kst_market_utility_transaction t
+                  JOIN kst_utility_bill b ON b.id = t.utility_bill_id
+                 WHERE t.utility_bill_id IN %(bill_ids)s
+                   AND t.verification_status = 'pending'
+                   AND NOT COALESCE(t.is_absent, FALSE)
+                   AND (b.allocation_method = 'flat' OR t.consumption > 0)
+        ), share AS (
+                SELECT line.*,
+                       CASE method
+                            WHEN 'proportional' THEN consumption * derived_rate
+                            WHEN 'loss_sharing' THEN bill_amount * consumption / SUM(consumption) OVER w
+                            ELSE bill_amount / stalls.stall_count / COUNT(*) OVER (PARTITION BY bill_id, stall_id)
+                       END AS raw_amount
+                  FROM line
+                  JOIN (SELECT bill_id, COUNT(DISTINCT stall_id) AS stall_count
+                          FROM line GROUP BY bill_id) stalls USING (bill_id)
+                WINDOW w AS (PARTITION BY bill_id)
+        ), rounded AS (
+                SELECT share.*,
+                       ROUND(raw_amount::numeric, 2) AS amount,
+                       ROW_NUMBER() OVER w AS rank,
+                       SUM(ROUND(raw_amount::numeric, 2)) OVER (PARTITION BY bill_id) AS allocated
+                  FROM share
+                WINDOW w AS (PARTITION BY bill_id ORDER BY raw_amount DESC, id)
+        ), allocation AS (
+                SELECT id, method, consumption, derived_rate,
+                       amount + CASE WHEN method != 'proportional' AND rank = 1
+                                     THEN ROUND(bill_amount::numeric, 2) - allocated
+                                     ELSE 0
+                                END AS amount
+                  FROM rounded
+        )
+        UPDATE kst_market_utility_transaction t
+           SET amount_due = a.amount,
+               applied_rate = CASE WHEN a.method = 'proportional' THEN a.derived_rate
+                                   WHEN a.consumption > 0 THEN a.amount / a.consumption
+                                   ELSE a.amount
+                              END,
+               write_uid = %(uid)s,
+               write_date = NOW() AT TIME ZONE 'UTC'
+          FROM allocation a
+         WHERE t.id = a.id
+     RETURNING t.id, t.utility_bill_id, t.amount_due
+    """
+
+    # Collection totals of the bills %(bill_ids)s over their transactions and
+    # monthly collection sheets: amount paid and whether any line is underpaid.
+    _financial_summary_query = """
+        SELECT line.bill_id, SUM(line.amount_paid), BOOL_OR(line.amount_due > line.amount_paid)
+          FROM (
+                SELECT utility_bill_id AS bill_id,
+                       COALESCE(amount_paid, 0) AS amount_paid, COALESCE(amount_due, 0) AS amount_due
+                  FROM kst_market_utility_transaction
+                 WHERE utility_bill_id IN %(bill_ids)s
+             UNION ALL
+                SELECT utility_bill_id, COALESCE(amount_paid, 0), COALESCE(amount_due, 0)
+                  FROM kst_market_utility_sheet
+                 WHERE utility_bill_id IN %(bill_ids)s
+               ) line
+      GROUP BY line.bill_id
+    """
+
+    # utility_type -> (stall utility account field, stall pay type field)
+    _stall_utility_fields = {
+        'electricity': ('electricity_utility_account_id', 'electric_pay_type_id'),
+        'water': ('water_utility_account_id', 'water_pay_type_id'),
+    }
 
     # Foreign Keys
     utility_account_id = fields.Many2one('kst.utility.account', string='Utility Account', 
-                                        required=True, ondelete='restrict', tracking=True)
+                                        required=True, ondelete='restrict', tracking=True, index=True)
 
     # Bill Information
     bill_date = fields.Date('Bill Date', required=True, tracking=True)
@@ -42,18 +136,35 @@ class UtilityBill(models.Model):
     ], string='Collection Status', default='draft', required=True, tracking=True,
        help="Workflow status: Draft > Published > Verified")
     
+    # Allocation of the provider bill over the stall transactions
+    allocation_method = fields.Selection([
+        ('proportional', 'Proportional to Consumption'),
+        ('loss_sharing', 'Loss Sharing'),
+        ('flat', 'Flat Split'),
+    ], string='Allocation Method', default='proportional', required=True, tracking=True,
+       help="Proportional: consumption x derived rate (unmetered losses are not passed on). "
+            "Loss Sharing: the whole bill is split in proportion to consumption. "
+            "Flat Split: the whole bill is split equally between stalls.")
+    daily_storage = fields.Selection([
+        ('transactions', 'One Transaction per Day'),
+        ('sheet', 'Monthly Collection Sheet'),
+    ], string='Daily Collection Storage', default='transactions', required=True, tracking=True,
+       help="How stalls with a daily pay type are generated. A monthly collection sheet holds the "
+            "whole month of a stall in one record; day transactions are only created on demand.")
+    
     # One2many relationship to transactions
     transaction_ids = fields.One2many('kst.market.utility.transaction', 'utility_bill_id', 
-                                     string='Utility Transactions')
+                                     string='Utility Transactions', context={'active_test': False})
     transaction_count = fields.Integer('Transaction Count', compute='_compute_transaction_count')
-    has_underpayment = fields.Boolean('Has Underpayment', compute='_compute_has_underpayment', store=False,
+    sheet_ids = fields.One2many('kst.market.utility.sheet', 'utility_bill_id', string='Collection Sheets')
+    has_underpayment = fields.Boolean('Has Underpayment', compute='_compute_financial_summary', store=True,
                                       help="True when any transaction has amount_paid < amount_due")
     
     # Financial Summary (computed from transactions)
     total_amount_paid = fields.Float('Total Amount Paid', digits=(12, 2), compute='_compute_financial_summary', 
-                                    store=False, help="Total amount collected from all transactions")
+                                    store=True, help="Total amount collected from all transactions")
     profit_loss = fields.Float('Profit & Loss', digits=(12, 2), compute='_compute_financial_summary', 
-                               store=False, help="Difference between amount paid and bill amount (Paid - Bill)")
+                               store=True, help="Difference between amount paid and bill amount (Paid - Bill)")
     
     stall_count = fields.Integer('Stall Count', compute='_compute_stall_count', store=False,
                                  help="Number of active stalls assigned to this utility account")
@@ -71,42 +182,42 @@ class UtilityBill(models.Model):
         for record in self:
             record.transaction_count = len(record.transaction_ids)
     
-    @api.depends('transaction_ids.amount_paid', 'transaction_ids.amount_due')
-    def _compute_has_underpayment(self):
-        for record in self:
-            record.has_underpayment = any(
-                (t.amount_due or 0.0) > (t.amount_paid or 0.0)
-                for t in record.transaction_ids
-            )
-    
     @api.depends('utility_account_id', 'utility_type')
     def _compute_stall_count(self):
+        # One grouped count for all the bills' accounts instead of a search per bill
+        counts = self.utility_account_id._get_stall_counts([('is_active', '=', True)])
         for record in self:
-            if record.utility_account_id and record.utility_type:
-                # Access stalls through reverse relationship based on utility type
-                if record.utility_type == 'electricity':
-                    stalls = self.env['kst.stall'].search([
-                        ('electricity_utility_account_id', '=', record.utility_account_id.id),
-                        ('is_active', '=', True)
-                    ])
-                elif record.utility_type == 'water':
-                    stalls = self.env['kst.stall'].search([
-                        ('water_utility_account_id', '=', record.utility_account_id.id),
-                        ('is_active', '=', True)
-                    ])
-                else:
-                    stalls = self.env['kst.stall']
-                record.stall_count = len(stalls)
-            else:
-                record.stall_count = 0
+            record.stall_count = counts.get(record.utility_account_id._origin.id, 0)
     
-    @api.depends('transaction_ids', 'transaction_ids.amount_paid', 'total_bill_amount')
+    @api.depends('total_bill_amount',
+                 'transaction_ids', 'transaction_ids.amount_paid', 'transaction_ids.amount_due',
+                 'sheet_ids', 'sheet_ids.amount_paid', 'sheet_ids.amount_due')
     def _compute_financial_summary(self):
-        """Compute total amount paid and profit/loss"""
+        """Compute total amount paid, profit/loss and underpayment over transactions and collection sheets"""
+        # Saved bills are aggregated with a single grouped query; bills being
+        # edited in a form (onchange) are summed from their in-memory lines.
+        saved = self.filtered(lambda b: isinstance(b.id, int))
+        summary = {}
+        if saved:
+            self.env['kst.market.utility.transaction'].flush(['utility_bill_id', 'amount_paid', 'amount_due'])
+            self.env['kst.market.utility.sheet'].flush(['utility_bill_id', 'amount_paid', 'amount_due'])
+            self.env.cr.execute(self._financial_summary_query, {'bill_ids': tuple(saved.ids)})
+            summary = {row[0]: row[1:] for row in self.env.cr.fetchall()}
         for record in self:
-            total_paid = sum(record.transaction_ids.mapped('amount_paid') or [0.0])
-            record.total_amount_paid = total_paid
-            record.profit_loss = total_paid - record.total_bill_amount
+            if record in saved:
+                total_paid, underpaid = summary.get(record.id, (0.0, False))
+            else:
+                lines = list(record.transaction_ids) + list(record.sheet_ids)
+                total_paid = sum(line.amount_paid or 0.0 for line in lines)
+                underpaid = any((line.amount_due or 0.0) > (line.amount_paid or 0.0) for line in lines)
+            record.total_amount_paid = total_paid or 0.0
+            record.profit_loss = record.total_amount_paid - record.total_bill_amount
+            record.has_underpayment = bool(underpaid)
+
+    def _schedule_financial_summary_recompute(self):
+        """Mark the stored financial summary for recomputation (after SQL inserts of transactions)"""
+        for fname in ('total_amount_paid', 'profit_loss', 'has_underpayment'):
+            self.env.add_to_compute(self._fields[fname], self)
 
     def action_publish(self):
         """Publish the utility bill for collection"""
@@ -142,23 +253,89 @@ class UtilityBill(models.Model):
             }
         }
     
-    def action_generate_soa(self):
-        """Prototype: trigger SOA generation placeholder.
+    def action_verify_pending_transactions(self):
+        """Verify every pending transaction and collection sheet of these bills (one update each)"""
+        domain = [('utility_bill_id', 'in', self.ids), ('verification_status', '=', 'pending')]
+        pending = self.env['kst.market.utility.transaction'].search(domain)
+        sheets = self.env['kst.market.utility.sheet'].search(domain)
+        if not pending and not sheets:
+            raise ValidationError("There are no pending transactions to verify!")
+        if sheets:
+            sheets._set_verification_status('verified')
+        if not pending:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': 'Payments Verified',
+                    'message': f"{len(sheets)} collection sheet(s) verified.",
+                    'type': 'success',
+                    'sticky': False,
+                }
+            }
+        return pending._action_set_verification_status('verified')
+    
+    def _allocate(self):
+        """Push these bills onto their transactions: applied_rate and amount_due
+        of every allocated row are written by a single UPDATE.
 
-        For now, just notify the user. In a full implementation, this would
-        render or queue an SOA report.
+        Returns {bill_id: (row_count, allocated_amount)}.
         """
-        self.ensure_one()
+        errors = []
+        for bill in self:
+            if bill.collection_status == 'verified':
+                errors.append(f"{bill.display_name}: verified bills cannot be reallocated.")
+            elif bill.total_bill_amount <= 0:
+                errors.append(f"{bill.display_name}: total bill amount must be set.")
+            elif bill.allocation_method == 'proportional' and bill.derived_rate <= 0:
+                errors.append(f"{bill.display_name}: total consumption must be set for proportional allocation.")
+        if errors:
+            raise ValidationError("Bills were not allocated:\n" + "\n".join(errors))
+
+        Transaction = self.env['kst.market.utility.transaction']
+        Transaction.flush(['utility_bill_id', 'stall_id', 'consumption', 'is_absent', 'verification_status'])
+        self.flush(['allocation_method', 'total_bill_amount', 'derived_rate'])
+        self.env.cr.execute(self._allocation_query, {'bill_ids': tuple(self.ids), 'uid': self.env.uid})
+        rows = self.env.cr.fetchall()
+
+        # Amounts were written behind the ORM: refresh caches and dependents
+        transactions = Transaction.browse([row[0] for row in rows])
+        Transaction.invalidate_cache(['applied_rate', 'amount_due', 'write_uid', 'write_date'], transactions.ids)
+        transactions.modified(['amount_due'])
+
+        summary = defaultdict(lambda: (0, 0.0))
+        for _txn_id, bill_id, amount_due in rows:
+            count, total = summary[bill_id]
+            summary[bill_id] = (count + 1, total + amount_due)
+        return dict(summary)
+
+    def action_allocate(self):
+        """Allocate the bill amount over its transactions using the allocation method"""
+        summary = self._allocate()
+        if not summary:
+            raise ValidationError("There are no transactions to allocate! Generate transactions and enter readings first.")
+        methods = dict(self._fields['allocation_method']._description_selection(self.env))
+        for bill in self:
+            count, total = summary.get(bill.id, (0, 0.0))
+            bill.message_post(body=(
+                f"Bill allocated ({methods[bill.allocation_method]}): "
+                f"₱{total:,.2f} over {count} transaction(s)."
+            ))
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
-                'title': 'SOA Requested',
-                'message': 'Generate SOA prototype triggered (placeholder).',
+                'title': 'Bill Allocated',
+                'message': f"Rates and amounts due were updated on {sum(c for c, _t in summary.values())} transaction(s).",
                 'type': 'success',
                 'sticky': False,
             }
         }
+    
+    def action_generate_soa(self):
+        """Queue the Statements of Account of every underpaid stall on these bills"""
+        return self.env['kst.market.utility.transaction']._soa_queue(
+            [('utility_bill_id', 'in', self.ids)], ', '.join(self.mapped('display_name')))
 
     @api.constrains('total_bill_amount', 'total_consumption')
     def _check_amounts(self):
@@ -197,40 +374,185 @@ class UtilityBill(models.Model):
             result.append((record.id, name))
         return result
     
-    def _generate_transaction_dates(self, frequency, period_from, period_to):
-        """Generate transaction dates based on frequency within the period"""
-        dates = []
-        current = period_from
-        
-        if frequency == 'daily':
-            # Generate dates for weekdays only (Monday-Friday)
-            while current <= period_to:
-                if current.weekday() < 5:  # Monday=0 to Friday=4
-                    dates.append(current)
-                current += timedelta(days=1)
-        elif frequency == 'weekly':
-            # Generate dates weekly (start on Monday)
-            # Find first Monday on or after period_from
-            while current.weekday() != 0:  # 0 = Monday
-                current += timedelta(days=1)
-            while current <= period_to:
-                dates.append(current)
-                current += timedelta(days=7)
-        elif frequency == 'monthly':
-            # Generate one date per month within the period
-            # Use the first day of each month
-            temp_date = period_from.replace(day=1)
-            while temp_date <= period_to:
-                if temp_date >= period_from:
-                    dates.append(temp_date)
-                # Move to next month
-                if temp_date.month == 12:
-                    temp_date = temp_date.replace(year=temp_date.year + 1, month=1)
-                else:
-                    temp_date = temp_date.replace(month=temp_date.month + 1)
-        
-        return sorted(dates)
-    
+    def _generate_transaction_dates(self, frequency, period_from, period_to, market_id=False):
+        """Generate transaction dates based on frequency within the period.
+
+        Dates come from the shared market calendar (collection days, weekly
+        collection weekday and holidays of the given market).
+        """
+        return self.env['kst.collection.calendar']._get_collection_dates(
+            market_id, frequency, period_from, period_to)
+
+    def _get_account_stalls(self):
+        """Active stalls assigned to the utility accounts of these bills (one search per utility type)"""
+        stalls = self.env['kst.stall']
+        for utility_type, (account_field, _pay_type_field) in self._stall_utility_fields.items():
+            accounts = self.filtered(lambda b: b.utility_type == utility_type).utility_account_id
+            if accounts:
+                stalls |= stalls.search([(account_field, 'in', accounts.ids), ('is_active', '=', True)])
+        return stalls
+
+    def _get_collection_schedule(self):
+        """(bill, stall id, frequency, collection dates) of every stall to generate for these bills.
+
+        Collection dates are computed once per market, frequency and period,
+        however many stalls share them.
+        """
+        stalls_by_account = defaultdict(list)
+        for stall in self._get_account_stalls():
+            for utility_type, (account_field, pay_type_field) in self._stall_utility_fields.items():
+                if stall[account_field] and stall[pay_type_field].sub_group:
+                    stalls_by_account[(stall[account_field].id, utility_type)].append(
+                        (stall.id, stall.market_id.id, stall[pay_type_field].sub_group))
+
+        dates_cache = {}
+        schedule = []
+        for bill in self:
+            period = (bill.period_covered_from, bill.period_covered_to)
+            for stall_id, market_id, frequency in stalls_by_account[(bill.utility_account_id.id, bill.utility_type)]:
+                key = (market_id, frequency) + period
+                if key not in dates_cache:
+                    dates_cache[key] = self._generate_transaction_dates(frequency, *period, market_id=market_id)
+                schedule.append((bill, stall_id, frequency, dates_cache[key]))
+        return schedule
+
+    @api.model
+    def _is_sheet_collection(self, bill, frequency):
+        return frequency == 'daily' and bill.daily_storage == 'sheet'
+
+    def _get_candidate_rows(self, schedule=None):
+        """(bill, stall, date) triples to generate for these bills.
+
+        Daily stalls of bills collected on monthly sheets are left out (see
+        _get_candidate_sheets).
+        """
+        if schedule is None:
+            schedule = self._get_collection_schedule()
+        return [
+            (bill.id, stall_id, day)
+            for bill, stall_id, frequency, dates in schedule
+            if not self._is_sheet_collection(bill, frequency)
+            for day in dates
+        ]
+
+    def _get_candidate_sheets(self, schedule=None):
+        """{(bill id, stall id, month): collection day bitmap} of the monthly sheets to generate"""
+        if schedule is None:
+            schedule = self._get_collection_schedule()
+        Sheet = self.env['kst.market.utility.sheet']
+        sheets = defaultdict(int)
+        for bill, stall_id, frequency, dates in schedule:
+            if self._is_sheet_collection(bill, frequency):
+                for day in dates:
+                    sheets[(bill.id, stall_id, day.replace(day=1))] |= Sheet._days_to_mask([day.day])
+        return dict(sheets)
+
+    def _insert_missing_sheets(self, schedule=None):
+        """Create the missing monthly collection sheets of these bills.
+
+        One sheet per stall and month replaces the daily transactions, so the
+        rows are few enough for a single batched create. Returns the sheets.
+        """
+        candidates = self._get_candidate_sheets(schedule)
+        Sheet = self.env['kst.market.utility.sheet']
+        if not candidates:
+            return Sheet
+        existing = {
+            (row['utility_bill_id'], row['stall_id'], row['month'])
+            for row in Sheet.search_read(
+                [('utility_bill_id', 'in', list({key[0] for key in candidates}))],
+                ['utility_bill_id', 'stall_id', 'month'], load=None)
+        }
+        bills = {bill.id: bill for bill in self}
+        rates = self.env['kst.market.utility.transaction']._get_default_rates(
+            [stall_id for _bill_id, stall_id, _month in candidates])
+        return Sheet.create([{
+            'utility_bill_id': bill_id,
+            'stall_id': stall_id,
+            'month': month,
+            'utility_type': bills[bill_id].utility_type,
+            'collection_mask': mask,
+            'applied_rate': rates.get(stall_id, {}).get(bills[bill_id].utility_type, 0.0),
+        } for (bill_id, stall_id, month), mask in candidates.items()
+            if (bill_id, stall_id, month) not in existing])
+
+    def _insert_missing_transactions(self, commit=False):
+        """Create the missing utility transactions of these bills with set-based SQL.
+
+        Candidate (bill, stall, date) rows are built in one pass, then inserted
+        in chunks with an INSERT ... SELECT whose anti-join skips the rows that
+        already exist. New rows get the stall's market, tenant and default rate
+        as applied rate; with no readings yet, that flat rate is also the
+        amount due. With ``commit``, each chunk is committed (for cron runs).
+        Daily stalls of bills in sheet storage mode get their monthly
+        collection sheets instead. Returns the number of records created.
+        """
+        bills = self.filtered(lambda b: b.utility_account_id and b.utility_type
+                              and b.period_covered_from and b.period_covered_to)
+        schedule = bills._get_collection_schedule()
+        sheets = bills._insert_missing_sheets(schedule)
+        rows = bills._get_candidate_rows(schedule)
+        if not rows:
+            return len(sheets)
+
+        Transaction = self.env['kst.market.utility.transaction']
+        self.flush(['utility_type'])
+        self.env['kst.stall'].flush(['market_id', 'tenant_id', 'default_electricity_rate', 'default_water_rate'])
+        Transaction.flush(['utility_bill_id', 'stall_id', 'transaction_date', 'utility_type'])
+
+        processed = 0
+        created = len(sheets)
+        for chunk in split_every(self._generation_chunk_size, rows, list):
+            bill_ids, stall_ids, dates = zip(*chunk)
+            self.env.cr.execute("""
+                INSERT INTO kst_market_utility_transaction
+                       (utility_bill_id, stall_id, transaction_date, utility_type,
+                        verification_status, is_absent, market_id, tenant_id,
+                        applied_rate, consumption, amount_due, active,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT u.bill_id, s.id, u.transaction_date, b.utility_type,
+                       'pending', FALSE, s.market_id, s.tenant_id,
+                       r.rate, 0, r.rate, TRUE,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM unnest(%(bill_ids)s::int[], %(stall_ids)s::int[], %(dates)s::date[])
+                       AS u(bill_id, stall_id, transaction_date)
+                  JOIN kst_utility_bill b ON b.id = u.bill_id
+                  JOIN kst_stall s ON s.id = u.stall_id
+                 CROSS JOIN LATERAL (
+                        SELECT COALESCE(CASE b.utility_type
+                                             WHEN 'electricity' THEN s.default_electricity_rate
+                                             ELSE s.default_water_rate
+                                        END, 0) AS rate
+                       ) r
+                 WHERE NOT EXISTS (
+                        SELECT 1
+                          FROM kst_market_utility_transaction t
+                         WHERE t.utility_bill_id = u.bill_id
+                           AND t.stall_id = u.stall_id
+                           AND t.transaction_date = u.transaction_date
+                           AND t.utility_type = b.utility_type
+                   )
+             RETURNING id
+            """, {
+                'uid': self.env.uid,
+                'bill_ids': list(bill_ids),
+                'stall_ids': list(stall_ids),
+                'dates': list(dates),
+            })
+            created += len(self.env.cr.fetchall())
+            processed += len(chunk)
+
+            # Rows were inserted behind the ORM
+            Transaction.invalidate_cache()
+            self.invalidate_cache(['transaction_ids'], bills.ids)
+            bills._schedule_financial_summary_recompute()
+            bills.recompute()
+            _logger.info("Utility transaction generation: %s bill(s), %s/%s candidate rows processed, %s created",
+                         len(bills), processed, len(rows), created)
+            if commit:
+                self.env.cr.commit()
+        return created
+
     def action_generate_transactions(self):
         """Generate utility transactions for all stalls assigned to this utility account.
 
@@ -245,74 +567,13 @@ class UtilityBill(models.Model):
         if not self.period_covered_from or not self.period_covered_to:
             raise ValidationError("Period coverage dates must be set to generate transactions!")
         
-        # Find all stalls with this utility account (based on utility type)
-        utility_type = self.utility_type
-        if utility_type == 'electricity':
-            stalls = self.env['kst.stall'].search([
-                ('electricity_utility_account_id', '=', self.utility_account_id.id),
-                ('is_active', '=', True)
-            ])
-        elif utility_type == 'water':
-            stalls = self.env['kst.stall'].search([
-                ('water_utility_account_id', '=', self.utility_account_id.id),
-                ('is_active', '=', True)
-            ])
-        else:
-            stalls = self.env['kst.stall']
-        
-        if not stalls:
-            raise ValidationError(f"No active stalls found for utility account {self.utility_account_id.display_name}!")
-        
-        # Determine which pay type field to use based on utility type
-        utility_type = self.utility_type
-        if utility_type not in ['electricity', 'water']:
+        if self.utility_type not in ['electricity', 'water']:
             raise ValidationError("Utility type must be electricity or water!")
         
-        # Generate transactions for each stall
-        transaction_vals_list = []
-        for stall in stalls:
-            # Get the pay type based on utility type
-            if utility_type == 'electricity':
-                pay_type = stall.electric_pay_type_id
-            else:  # water
-                pay_type = stall.water_pay_type_id
-            
-            if not pay_type:
-                continue  # Skip stalls without pay type for this utility
-            
-            # Get frequency from pay type
-            frequency = pay_type.sub_group
-            if not frequency:
-                continue  # Skip if no frequency set
-            
-            # Generate transaction dates based on frequency
-            transaction_dates = self._generate_transaction_dates(
-                frequency, 
-                self.period_covered_from, 
-                self.period_covered_to
-            )
-            
-            # Check for existing transactions to avoid duplicates
-            existing_dates = self.env['kst.market.utility.transaction'].search([
-                ('stall_id', '=', stall.id),
-                ('utility_bill_id', '=', self.id),
-                ('utility_type', '=', utility_type),
-            ]).mapped('transaction_date')
-            
-            # Create transaction records (incomplete - missing readings, amounts, etc.)
-            for trans_date in transaction_dates:
-                if trans_date not in existing_dates:
-                    transaction_vals_list.append({
-                        'stall_id': stall.id,
-                        'utility_bill_id': self.id,
-                        'transaction_date': trans_date,
-                        'utility_type': utility_type,
-                        # Leave empty: previous_reading, current_reading, consumption, 
-                        # applied_rate, amount_paid, receipt_number
-                    })
+        if not self._get_account_stalls():
+            raise ValidationError(f"No active stalls found for utility account {self.utility_account_id.display_name}!")
         
-        if transaction_vals_list:
-            self.env['kst.market.utility.transaction'].create(transaction_vals_list)
+        self._insert_missing_transactions()
         # Whether or not records were created, reload the form so the user sees
         # the current transactions immediately.
         return {
@@ -320,3 +581,22 @@ class UtilityBill(models.Model):
             'tag': 'reload',
         }
 
+    @api.model
+    def _generate_cycle_transactions(self, cycle_date=None, commit=False):
+        """Generate the transactions of every draft bill of a billing cycle.
+
+        The cycle is the calendar month of ``cycle_date`` (default: today),
+        matched on the bill date. Returns the number of transactions created.
+        """
+        cycle_date = cycle_date or fields.Date.today()
+        bills = self.search([
+            ('collection_status', '=', 'draft'),
+            ('bill_date', '>=', date_utils.start_of(cycle_date, 'month')),
+            ('bill_date', '<=', date_utils.end_of(cycle_date, 'month')),
+        ])
+        return bills._insert_missing_transactions(commit=commit)
+
+    @api.model
+    def _cron_generate_cycle_transactions(self):
+        """Generate the transactions of the current billing cycle's draft bills."""
+        self._generate_cycle_transactions(commit=True)
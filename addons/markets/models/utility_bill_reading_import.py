@@ -0,0 +1,26 @@
+from odoo import fields, models
+
+
+class UtilityBillReadingImport(models.TransientModel):
+    """Wizard to import sub-meter readings into a utility bill's transactions"""
+    _name = 'kst.utility.bill.reading.import'
+    _inherit = 'kst.meter.reading.import'
+    _description = 'Import Utility Bill Readings'
+    _transaction_model = 'kst.market.utility.transaction'
+    _subject_field = 'stall_id'
+    _key_column = 'sub_meter_number'
+    _subject_key_fields = {
+        'sub_meter_number': 'electricity_sub_meter_number',
+        'stall_code': 'code',
+    }
+
+    bill_id = fields.Many2one('kst.utility.bill', string='Utility Bill', required=True, ondelete='cascade',
+                              default=lambda self: self.env.context.get('active_id'))
+    match_by = fields.Selection([
+        ('sub_meter_number', 'Sub-Meter Number'),
+        ('stall_code', 'Stall Code'),
+    ], string='Match By', default='sub_meter_number', required=True,
+       help="Column of the file used to find the stall: sub_meter_number or stall_code")
+
+    def _get_key_column(self):
+        return self.match_by
@@ -0,0 +1,306 @@
+from odoo import api, fields, models
+from odoo.exceptions import ValidationError
+from calendar import monthrange
+import json
+
+
+class MarketUtilitySheet(models.Model):
+    """Monthly collection sheet of a daily flat-rate utility.
+
+    Bills in "Monthly Collection Sheet" storage mode get one sheet per stall
+    and month for their daily-collected stalls instead of one
+    kst.market.utility.transaction per collection day. The days are stored
+    compactly: bit (day - 1) of collection_mask / absence_mask marks a
+    collection day / an absence, and amounts_paid is a JSON list with the
+    amount paid on each day of the month.
+
+    An individual day transaction (for a receipt, attachments or a separate
+    review) is only created on demand by _materialize_days(); that day then
+    leaves the sheet totals and is counted on its transaction instead.
+
+    Underpaid sheets appear on the Statements of Account of their stall (one
+    line per sheet, see kst.market.utility.transaction._soa_collect), and
+    default rate changes of the stall reprice pending sheets with nothing
+    paid, like open day transactions.
+    """
+    _name = 'kst.market.utility.sheet'
+    _description = 'Monthly Utility Collection Sheet'
+    _inherit = ['kst.audit.mixin', 'kst.payment.verification.mixin', 'kst.soa.mixin', 'kst.utility.rate.mixin']
+    _order = "month desc, stall_id"
+    _verification_parent_field = 'utility_bill_id'
+    _soa_subject_field = 'stall_id'
+    _soa_billed_to_field = 'tenant_id'
+    _soa_date_field = 'month'
+    _rate_subject_field = 'stall_id'
+    _sql_constraints = [
+        ('bill_stall_month_unique', 'UNIQUE(utility_bill_id, stall_id, utility_type, month)',
+         'A stall can only have one collection sheet per bill and month!'),
+    ]
+
+    # Foreign Keys
+    utility_bill_id = fields.Many2one('kst.utility.bill', string='Utility Bill', required=True,
+                                      ondelete='restrict', index=True)
+    stall_id = fields.Many2one('kst.stall', string='Stall', required=True, ondelete='restrict', index=True)
+    market_id = fields.Many2one('kst.market', related='stall_id.market_id', string='Market', store=True, readonly=True)
+    tenant_id = fields.Many2one('kst.tenant', related='stall_id.tenant_id', string='Tenant', store=True, readonly=True)
+
+    # Sheet Information
+    month = fields.Date('Month', required=True, help="First day of the month covered by this sheet")
+    utility_type = fields.Selection([
+        ('electricity', 'Electricity'),
+        ('water', 'Water'),
+    ], string='Utility Type', required=True)
+    applied_rate = fields.Float('Daily Rate', digits=(12, 2),
+                                help="Flat rate due on each collection day the stall is not absent")
+    verification_status = fields.Selection([
+        ('pending', 'Pending Review'),
+        ('verified', 'Verified'),
+        ('check_bounced', 'Check Bounced'),
+        ('rejected', 'Rejected'),
+    ], string='Verification Status', default='pending', required=True,
+       help="Manager verification status for payment review")
+
+    # Compact day storage
+    collection_mask = fields.Integer('Collection Days', readonly=True,
+                                     help="Bitmap of the collection days (bit 0 = day 1)")
+    absence_mask = fields.Integer('Absent Days',
+                                  help="Bitmap of the days the stall was absent (bit 0 = day 1)")
+    amounts_paid = fields.Text('Daily Amounts Paid', default='[]',
+                               help="JSON list of the amount paid on each day of the month")
+
+    # Days moved to their own transaction
+    transaction_ids = fields.One2many('kst.market.utility.transaction', 'sheet_id', string='Day Transactions',
+                                      readonly=True, context={'active_test': False})
+    materialized_mask = fields.Integer('Days with Transaction', compute='_compute_materialized_mask', store=True,
+                                       help="Bitmap of the days that have their own utility transaction")
+
+    # Totals of the days kept on the sheet
+    collection_day_count = fields.Integer('Collection Days', compute='_compute_totals', store=True)
+    absent_day_count = fields.Integer('Absent Days', compute='_compute_totals', store=True)
+    amount_due = fields.Float('Amount Due', digits=(12, 2), compute='_compute_totals', store=True)
+    amount_paid = fields.Float('Amount Paid', digits=(12, 2), compute='_compute_totals', store=True)
+    day_summary = fields.Text('Days', compute='_compute_day_summary')
+
+    @api.model
+    def _get_audit_fields(self):
+        # No mail tracking on sheets: audit the collection fields explicitly
+        return ['applied_rate', 'verification_status', 'absence_mask', 'amounts_paid']
+
+    @api.model
+    def _days_to_mask(self, days):
+        mask = 0
+        for day in days:
+            mask |= 1 << (day - 1)
+        return mask
+
+    @api.model
+    def _mask_to_days(self, mask):
+        return [day for day in range(1, 32) if (mask or 0) & (1 << (day - 1))]
+
+    def _get_amounts(self):
+        """Amount paid per day of the month, as a list of 31 floats (index = day - 1)"""
+        self.ensure_one()
+        amounts = json.loads(self.amounts_paid or '[]')
+        return amounts + [0.0] * (31 - len(amounts))
+
+    @api.depends('transaction_ids', 'transaction_ids.transaction_date')
+    def _compute_materialized_mask(self):
+        for record in self:
+            record.materialized_mask = record._days_to_mask(
+                [transaction.transaction_date.day for transaction in record.transaction_ids])
+
+    @api.depends('collection_mask', 'absence_mask', 'materialized_mask', 'amounts_paid', 'applied_rate')
+    def _compute_totals(self):
+        for record in self:
+            days = record._mask_to_days(record.collection_mask & ~record.materialized_mask)
+            absent = set(record._mask_to_days(record.absence_mask))
+            amounts = record._get_amounts()
+            record.collection_day_count = len(days)
+            record.absent_day_count = len([day for day in days if day in absent])
+            record.amount_due = record.applied_rate * (record.collection_day_count - record.absent_day_count)
+            record.amount_paid = sum(amounts[day - 1] for day in days)
+
+    @api.depends('month', 'collection_mask', 'absence_mask', 'materialized_mask', 'amounts_paid')
+    def _compute_day_summary(self):
+        for record in self:
+            if not record.month:
+                record.day_summary = False
+                continue
+            absent = set(record._mask_to_days(record.absence_mask))
+            materialized = set(record._mask_to_days(record.materialized_mask))
+            amounts = record._get_amounts()
+            lines = []
+            for day in record._mask_to_days(record.collection_mask):
+                date = record.month.replace(day=day)
+                if day in materialized:
+                    status = "see day transaction"
+                elif day in absent:
+                    status = "absent"
+                else:
+                    status = f"paid {amounts[day - 1]:,.2f}"
+                lines.append(f"{date.strftime('%a %d')}: {status}")
+            record.day_summary = '\n'.join(lines)
+
+    @api.constrains('month', 'collection_mask')
+    def _check_month(self):
+        for record in self:
+            if record.month and record.month.day != 1:
+                raise ValidationError("The month of a collection sheet must be the first day of the month!")
+            if record.month and record.collection_mask >> monthrange(record.month.year, record.month.month)[1]:
+                raise ValidationError("Collection days must be within the month of the sheet!")
+
+    def _check_editable_days(self, days):
+        """Raise unless every day is a collection day still kept on this sheet"""
+        self.ensure_one()
+        if self.verification_status != 'pending':
+            raise ValidationError("Only pending collection sheets can be changed!")
+        kept = set(self._mask_to_days(self.collection_mask & ~self.materialized_mask))
+        invalid = sorted(set(days) - kept)
+        if invalid:
+            raise ValidationError(
+                f"Day(s) {', '.join(map(str, invalid))} of {self.month.strftime('%B %Y')} are not collection days "
+                "of this sheet or already have their own transaction!")
+
+    def _set_days(self, values):
+        """Record collections on this sheet in one write.
+
+        ``values`` maps a day of the month to a dict with ``amount_paid``
+        and/or ``is_absent``.
+        """
+        self.ensure_one()
+        self._check_editable_days(values)
+        amounts = self._get_amounts()
+        absence_mask = self.absence_mask
+        for day, day_values in values.items():
+            if 'amount_paid' in day_values:
+                if (day_values['amount_paid'] or 0.0) < 0:
+                    raise ValidationError("Amount paid cannot be negative!")
+                amounts[day - 1] = day_values['amount_paid'] or 0.0
+            if 'is_absent' in day_values:
+                if day_values['is_absent']:
+                    absence_mask |= 1 << (day - 1)
+                else:
+                    absence_mask &= ~(1 << (day - 1))
+        self.write({'amounts_paid': json.dumps(amounts), 'absence_mask': absence_mask})
+
+    def _materialize_days(self, days):
+        """Create the individual utility transactions of these days (on demand).
+
+        The day's amount paid and absence move to the new transaction, which
+        then counts that day instead of the sheet. Returns the transactions.
+        """
+        self.ensure_one()
+        self._check_editable_days(days)
+        amounts = self._get_amounts()
+        absent = set(self._mask_to_days(self.absence_mask))
+        transactions = self.env['kst.market.utility.transaction'].create([{
+            'sheet_id': self.id,
+            'utility_bill_id': self.utility_bill_id.id,
+            'stall_id': self.stall_id.id,
+            'utility_type': self.utility_type,
+            'transaction_date': self.month.replace(day=day),
+            'applied_rate': self.applied_rate,
+            'is_absent': day in absent,
+            'amount_paid': amounts[day - 1],
+        } for day in sorted(set(days))])
+        for day in days:
+            amounts[day - 1] = 0.0
+        self.write({
+            'amounts_paid': json.dumps(amounts),
+            'absence_mask': self.absence_mask & ~self._days_to_mask(days),
+        })
+        return transactions
+
+    def action_enter_day(self):
+        """Open the day entry wizard of this sheet"""
+        self.ensure_one()
+        return {
+            'name': 'Record Collection',
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.market.utility.sheet.entry',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'default_sheet_id': self.id},
+        }
+
+    def action_view_transactions(self):
+        """Action to view the individual day transactions of this sheet"""
+        self.ensure_one()
+        return {
+            'name': 'Day Transactions',
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.market.utility.transaction',
+            'view_mode': 'tree,form',
+            'domain': [('sheet_id', '=', self.id)],
+            'context': {'active_test': False},
+        }
+
+    def action_verify(self):
+        """Verify the selected pending collection sheets"""
+        return self._action_set_verification_status('verified')
+
+    def action_reject(self):
+        """Reject the selected pending collection sheets"""
+        return self._action_set_verification_status('rejected')
+
+    def name_get(self):
+        result = []
+        for record in self:
+            month = record.month.strftime('%B %Y') if record.month else ''
+            result.append((record.id, f"{record.stall_id.display_name} - {month}"))
+        return result
+
+
+class MarketUtilitySheetEntry(models.TransientModel):
+    """Wizard to record one day of a monthly collection sheet"""
+    _name = 'kst.market.utility.sheet.entry'
+    _description = 'Record Collection Sheet Day'
+
+    sheet_id = fields.Many2one('kst.market.utility.sheet', string='Collection Sheet', required=True)
+    transaction_date = fields.Date('Date', required=True, default=fields.Date.today)
+    is_absent = fields.Boolean('Absent')
+    amount_paid = fields.Float('Amount Paid', digits=(12, 2))
+
+    @api.onchange('sheet_id', 'transaction_date')
+    def _onchange_day(self):
+        """Show the values already recorded for this day"""
+        if self.sheet_id and self._get_day():
+            day = self._get_day()
+            self.amount_paid = self.sheet_id._get_amounts()[day - 1]
+            self.is_absent = day in self.sheet_id._mask_to_days(self.sheet_id.absence_mask)
+
+    def _get_day(self):
+        self.ensure_one()
+        month = self.sheet_id.month
+        if not (month and self.transaction_date
+                and (self.transaction_date.year, self.transaction_date.month) == (month.year, month.month)):
+            return False
+        return self.transaction_date.day
+
+    def _get_checked_day(self):
+        day = self._get_day()
+        if not day:
+            raise ValidationError(f"The date must be in {self.sheet_id.month.strftime('%B %Y')}!")
+        return day
+
+    def action_apply(self):
+        """Record the day on the sheet"""
+        self.ensure_one()
+        self.sheet_id._set_days({self._get_checked_day(): {
+            'amount_paid': self.amount_paid,
+            'is_absent': self.is_absent,
+        }})
+        return {'type': 'ir.actions.act_window_close'}
+
+    def action_create_transaction(self):
+        """Record the day, then move it to its own utility transaction and open it"""
+        self.ensure_one()
+        day = self._get_checked_day()
+        self.sheet_id._set_days({day: {'amount_paid': self.amount_paid, 'is_absent': self.is_absent}})
+        transaction = self.sheet_id._materialize_days([day])
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'kst.market.utility.transaction',
+            'res_id': transaction.id,
+            'view_mode': 'form',
+        }
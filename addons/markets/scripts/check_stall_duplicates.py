@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pre-import duplicate report for staged stall data.
+
+kst.stall enforces UNIQUE(market_id, code) in the database, so a staged load
+containing the same stall code twice in one market aborts on the first
+conflicting row. Run this before importing to list every conflict in one pass.
+
+Supported inputs:
+    * Odoo data files (e.g. demo/standardized_stalls.xml) - kst.stall records
+      with market_id (ref) and code fields
+    * CSV files with market and code columns (Odoo import format uses
+      market_id and code; override with --market-column / --code-column)
+
+Usage:
+    python check_stall_duplicates.py ../demo/standardized_stalls.xml
+    python check_stall_duplicates.py stalls.csv --market-column MarketCode --code-column StallCode
+
+Exits with status 1 when duplicates are found.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+
+
+def iter_xml_stalls(file_path):
+    """Yield (market, code, location) for each kst.stall record in an Odoo data file."""
+    for _event, elem in ET.iterparse(file_path, events=('end',)):
+        if elem.tag != 'record' or elem.get('model') != 'kst.stall':
+            continue
+        market = code = None
+        for field in elem.iter('field'):
+            if field.get('name') == 'market_id':
+                market = field.get('ref') or (field.text or '').strip()
+            elif field.get('name') == 'code':
+                code = (field.text or '').strip()
+        yield market, code, elem.get('id')
+        elem.clear()
+
+
+def iter_csv_stalls(file_path, market_column, code_column):
+    """Yield (market, code, location) for each row of a CSV file."""
+    with open(file_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = {market_column, code_column} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{file_path}: missing column(s) {', '.join(sorted(missing))}")
+        for line_number, row in enumerate(reader, start=2):
+            yield (row[market_column] or '').strip(), (row[code_column] or '').strip(), f"line {line_number}"
+
+
+def find_duplicates(rows):
+    """Group staged rows by (market, code) and keep the keys seen more than once."""
+    seen = defaultdict(list)
+    for market, code, location in rows:
+        if market and code:
+            seen[(market, code)].append(location)
+    return {key: locations for key, locations in seen.items() if len(locations) > 1}
+
+
+def check_files(file_paths, market_column='market_id', code_column='code'):
+    """Return duplicates across all files, keyed by (market, code)."""
+    def rows():
+        for file_path in file_paths:
+            name = os.path.basename(file_path)
+            if file_path.lower().endswith('.xml'):
+                stalls = iter_xml_stalls(file_path)
+            else:
+                stalls = iter_csv_stalls(file_path, market_column, code_column)
+            for market, code, location in stalls:
+                yield market, code, f"{name}:{location}"
+    return find_duplicates(rows())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report duplicate stall codes per market in staged data')
+    parser.add_argument('files', nargs='+', help='Odoo XML data files or CSV files to check')
+    parser.add_argument('--market-column', default='market_id', help='CSV column holding the market')
+    parser.add_argument('--code-column', default='code', help='CSV column holding the stall code')
+    args = parser.parse_args()
+
+    duplicates = check_files(args.files, args.market_column, args.code_column)
+
+    if not duplicates:
+        print("✓ No duplicate stall codes found")
+        sys.exit(0)
+
+    print(f"✗ {len(duplicates)} duplicate stall code(s) found:")
+    for (market, code), locations in sorted(duplicates.items()):
+        print(f"  [{market}] {code}: {', '.join(locations)}")
+    sys.exit(1)
@@ -7,7 +7,7 @@ from . import contract
 from . import unit_rent_transaction
 from . import utility_account
 from . import unit_utility_bill
+from . import unit_utility_bill_reading_import
 from . import unit_utility_transaction
 from . import payment_attachment
-
-
+from . import index_check
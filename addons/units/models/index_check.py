@@ -0,0 +1,17 @@
+from odoo import api, models
+
+
+class IndexCheck(models.TransientModel):
+    _inherit = 'kst.index.check'
+
+    @api.model
+    def _get_index_checks(self):
+        return super()._get_index_checks() + [
+            ("Units of an electricity account", 'kst.unit',
+             [('electricity_utility_account_id', '=', 0)], None, 'kst_unit_electricity_utility_account_id_index'),
+            ("Units of a water account", 'kst.unit',
+             [('water_utility_account_id', '=', 0)], None, 'kst_unit_water_utility_account_id_index'),
+            ("Underpaid unit utility bills of a period", 'kst.unit.utility.bill',
+             [('has_underpayment', '=', True), ('bill_date', '>=', '2000-01-01')], None,
+             self.env['kst.unit.utility.bill']._get_index_name('underpayment')),
+        ]
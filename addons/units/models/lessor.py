@@ -26,6 +26,11 @@ class Lessor(models.Model):
             record.unit_count = len(record.unit_ids)
             record.contract_count = len(record.contract_ids)
 
+    def action_generate_soa(self):
+        """Queue the Statements of Account of every underpaid unit of these lessors"""
+        return self.env['kst.unit.utility.transaction']._soa_queue(
+            [('lessor_id', 'in', self.ids)], ', '.join(self.mapped('display_name')))
+
     def name_get(self):
         result = []
         for record in self:
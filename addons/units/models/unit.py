@@ -26,11 +26,11 @@ class Unit(models.Model):
     # Utility Account Foreign Keys (separate for electricity and water)
     electricity_utility_account_id = fields.Many2one(
         'kst.utility.account', string='Electricity Utility Account',
-        domain=[('utility_type', '=', 'electricity')], ondelete='restrict', tracking=True,
+        domain=[('utility_type', '=', 'electricity')], ondelete='restrict', tracking=True, index=True,
         help="Utility account for electricity billing")
     water_utility_account_id = fields.Many2one(
         'kst.utility.account', string='Water Utility Account',
-        domain=[('utility_type', '=', 'water')], ondelete='restrict', tracking=True,
+        domain=[('utility_type', '=', 'water')], ondelete='restrict', tracking=True, index=True,
         help="Utility account for water billing")
     
     # Default Rates (for flat rate billing when no bill is associated)
@@ -69,6 +69,14 @@ class Unit(models.Model):
         for record in self:
             record.utility_transaction_count = len(record.utility_transaction_ids)
 
+    def write(self, vals):
+        """Apply default rate changes to open utility transactions only (verified history is frozen)"""
+        Transaction = self.env['kst.unit.utility.transaction']
+        rate_changes = Transaction._get_rate_changes(self, vals)
+        result = super().write(vals)
+        Transaction._reprice_open_transactions(rate_changes)
+        return result
+
     def name_get(self):
         result = []
         for record in self:
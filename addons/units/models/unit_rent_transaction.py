@@ -5,7 +5,7 @@ from odoo.exceptions import ValidationError
 class UnitRentTransaction(models.Model):
     _name = 'kst.unit.rent.transaction'
     _description = 'Unit Rent Transaction'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.audit.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = "transaction_date desc, id desc"
 
     # Foreign Keys
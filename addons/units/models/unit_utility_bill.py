@@ -6,12 +6,29 @@ from datetime import timedelta
 class UnitUtilityBill(models.Model):
     _name = 'kst.unit.utility.bill'
     _description = 'Unit Utility Bill'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.index.mixin', 'kst.meter.carry.forward.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = "bill_date desc, id desc"
+    _indexes = {
+        # "Underpaid bills of a period" reads only the underpaid rows
+        'underpayment': (['bill_date'], "has_underpayment"),
+    }
+    _carry_transaction_model = 'kst.unit.utility.transaction'
+    _carry_subject_field = 'unit_id'
+
+    # Collection totals of the bills %(bill_ids)s over their transactions:
+    # amount paid and whether any transaction is underpaid.
+    _financial_summary_query = """
+        SELECT utility_bill_id,
+               SUM(COALESCE(amount_paid, 0)),
+               BOOL_OR(COALESCE(amount_due, 0) > COALESCE(amount_paid, 0))
+          FROM kst_unit_utility_transaction
+         WHERE utility_bill_id IN %(bill_ids)s
+      GROUP BY utility_bill_id
+    """
 
     # Foreign Keys
     utility_account_id = fields.Many2one('kst.utility.account', string='Utility Account', 
-                                        required=True, ondelete='restrict', tracking=True)
+                                        required=True, ondelete='restrict', tracking=True, index=True)
 
     # Bill Information
     bill_date = fields.Date('Bill Date', required=True, tracking=True)
@@ -46,14 +63,14 @@ class UnitUtilityBill(models.Model):
     transaction_ids = fields.One2many('kst.unit.utility.transaction', 'utility_bill_id', 
                                      string='Utility Transactions')
     transaction_count = fields.Integer('Transaction Count', compute='_compute_transaction_count')
-    has_underpayment = fields.Boolean('Has Underpayment', compute='_compute_has_underpayment', store=False,
+    has_underpayment = fields.Boolean('Has Underpayment', compute='_compute_financial_summary', store=True,
                                       help="True when any transaction has amount_paid < amount_due")
     
     # Financial Summary (computed from transactions)
     total_amount_paid = fields.Float('Total Amount Paid', digits=(12, 2), compute='_compute_financial_summary', 
-                                    store=False, help="Total amount collected from all transactions")
+                                    store=True, help="Total amount collected from all transactions")
     profit_loss = fields.Float('Profit & Loss', digits=(12, 2), compute='_compute_financial_summary', 
-                               store=False, help="Difference between amount paid and bill amount (Paid - Bill)")
+                               store=True, help="Difference between amount paid and bill amount (Paid - Bill)")
     
     unit_count = fields.Integer('Unit Count', compute='_compute_unit_count', store=False,
                                  help="Number of units assigned to this utility account")
@@ -71,40 +88,34 @@ class UnitUtilityBill(models.Model):
         for record in self:
             record.transaction_count = len(record.transaction_ids)
     
-    @api.depends('transaction_ids.amount_paid', 'transaction_ids.amount_due')
-    def _compute_has_underpayment(self):
-        for record in self:
-            record.has_underpayment = any(
-                (t.amount_due or 0.0) > (t.amount_paid or 0.0)
-                for t in record.transaction_ids
-            )
-    
     @api.depends('utility_account_id', 'utility_type')
     def _compute_unit_count(self):
+        # One grouped count for all the bills' accounts instead of a search per bill
+        counts = self.utility_account_id._get_unit_counts()
         for record in self:
-            if record.utility_account_id and record.utility_type:
-                # Access units through reverse relationship based on utility type
-                if record.utility_type == 'electricity':
-                    units = self.env['kst.unit'].search([
-                        ('electricity_utility_account_id', '=', record.utility_account_id.id),
-                    ])
-                elif record.utility_type == 'water':
-                    units = self.env['kst.unit'].search([
-                        ('water_utility_account_id', '=', record.utility_account_id.id),
-                    ])
-                else:
-                    units = self.env['kst.unit']
-                record.unit_count = len(units)
-            else:
-                record.unit_count = 0
+            record.unit_count = counts.get(record.utility_account_id._origin.id, 0)
     
-    @api.depends('transaction_ids', 'transaction_ids.amount_paid', 'total_bill_amount')
+    @api.depends('total_bill_amount',
+                 'transaction_ids', 'transaction_ids.amount_paid', 'transaction_ids.amount_due')
     def _compute_financial_summary(self):
-        """Compute total amount paid and profit/loss"""
+        """Compute total amount paid, profit/loss and underpayment"""
+        # Saved bills are aggregated with a single grouped query; bills being
+        # edited in a form (onchange) are summed from their in-memory lines.
+        saved = self.filtered(lambda b: isinstance(b.id, int))
+        summary = {}
+        if saved:
+            self.env['kst.unit.utility.transaction'].flush(['utility_bill_id', 'amount_paid', 'amount_due'])
+            self.env.cr.execute(self._financial_summary_query, {'bill_ids': tuple(saved.ids)})
+            summary = {row[0]: row[1:] for row in self.env.cr.fetchall()}
         for record in self:
-            total_paid = sum(record.transaction_ids.mapped('amount_paid') or [0.0])
-            record.total_amount_paid = total_paid
-            record.profit_loss = total_paid - record.total_bill_amount
+            if record in saved:
+                total_paid, underpaid = summary.get(record.id, (0.0, False))
+            else:
+                total_paid = sum(record.transaction_ids.mapped('amount_paid'))
+                underpaid = any((t.amount_due or 0.0) > (t.amount_paid or 0.0) for t in record.transaction_ids)
+            record.total_amount_paid = total_paid or 0.0
+            record.profit_loss = record.total_amount_paid - record.total_bill_amount
+            record.has_underpayment = bool(underpaid)
 
     def action_publish(self):
         """Publish the utility bill for collection"""
@@ -141,18 +152,9 @@ class UnitUtilityBill(models.Model):
         }
     
     def action_generate_soa(self):
-        """Prototype: trigger SOA generation placeholder."""
-        self.ensure_one()
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'SOA Requested',
-                'message': 'Generate SOA prototype triggered (placeholder).',
-                'type': 'success',
-                'sticky': False,
-            }
-        }
+        """Queue the Statements of Account of every underpaid unit on these bills"""
+        return self.env['kst.unit.utility.transaction']._soa_queue(
+            [('utility_bill_id', 'in', self.ids)], ', '.join(self.mapped('display_name')))
 
     @api.constrains('total_bill_amount', 'total_consumption')
     def _check_amounts(self):
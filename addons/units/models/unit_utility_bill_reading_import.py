@@ -0,0 +1,15 @@
+from odoo import fields, models
+
+
+class UnitUtilityBillReadingImport(models.TransientModel):
+    """Wizard to import meter readings into a unit utility bill's transactions"""
+    _name = 'kst.unit.utility.bill.reading.import'
+    _inherit = 'kst.meter.reading.import'
+    _description = 'Import Unit Utility Bill Readings'
+    _transaction_model = 'kst.unit.utility.transaction'
+    _subject_field = 'unit_id'
+    _key_column = 'unit_code'
+    _subject_key_fields = {'unit_code': 'full_code'}
+
+    bill_id = fields.Many2one('kst.unit.utility.bill', string='Utility Bill', required=True, ondelete='cascade',
+                              default=lambda self: self.env.context.get('active_id'))
@@ -5,8 +5,11 @@ from odoo.exceptions import ValidationError
 class UnitUtilityTransaction(models.Model):
     _name = 'kst.unit.utility.transaction'
     _description = 'Unit Utility Transaction'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['kst.soa.mixin', 'kst.utility.rate.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = "transaction_date desc, id desc"
+    _soa_subject_field = 'unit_id'
+    _soa_billed_to_field = 'lessor_id'
+    _rate_subject_field = 'unit_id'
 
     # Foreign Keys
     unit_id = fields.Many2one('kst.unit', string='Unit', required=True, ondelete='restrict', tracking=True)
@@ -83,43 +86,31 @@ class UnitUtilityTransaction(models.Model):
     @api.onchange('unit_id', 'utility_type')
     def _onchange_unit_set_default_rate(self):
         """Set applied_rate to default rate from unit when unit or utility type changes"""
+        rates = self._get_default_rates(self.unit_id._origin.ids)
         for record in self:
             # Only set if applied_rate is not already set (0 or None)
-            if not record.applied_rate or record.applied_rate == 0:
-                if record.unit_id:
-                    if record.utility_type == 'electricity':
-                        record.applied_rate = record.unit_id.default_electricity_rate or 0.0
-                    elif record.utility_type == 'water':
-                        record.applied_rate = record.unit_id.default_water_rate or 0.0
-                    else:
-                        record.applied_rate = 0.0
-                else:
-                    record.applied_rate = 0.0
+            if not record.applied_rate:
+                record.applied_rate = rates.get(record.unit_id._origin.id, {}).get(record.utility_type, 0.0)
     
     @api.model_create_multi
     def create(self, vals_list):
-        """Set applied_rate to default rate when creating new records"""
-        for vals in vals_list:
-            # Only set if applied_rate is not provided or is 0
-            if 'applied_rate' not in vals or not vals.get('applied_rate') or vals.get('applied_rate') == 0:
-                unit_id = vals.get('unit_id')
-                utility_type = vals.get('utility_type')
-                
-                if unit_id and utility_type:
-                    unit = self.env['kst.unit'].browse(unit_id)
-                    if utility_type == 'electricity':
-                        vals['applied_rate'] = unit.default_electricity_rate or 0.0
-                    elif utility_type == 'water':
-                        vals['applied_rate'] = unit.default_water_rate or 0.0
-        
+        """Set applied_rate to default rate when creating new records (rates read in one query)"""
+        self._set_default_applied_rates(vals_list)
         return super().create(vals_list)
     
     @api.depends('applied_rate', 'consumption', 'previous_reading', 'current_reading', 
-                 'unit_id', 'utility_type',
-                 'unit_id.default_electricity_rate', 'unit_id.default_water_rate')
+                 'unit_id', 'utility_type')
     def _compute_amount_due(self):
-        """Compute amount due based on consumption × rate (if metered) or flat rate."""
+        """Compute amount due based on consumption × rate (if metered) or flat rate.
+        Verified transactions keep their stored amount (frozen history); default
+        unit rate changes reach open transactions through _reprice_open_transactions.
+        """
+        frozen = self._get_frozen_amount_due()
         for record in self:
+            if record._origin.id in frozen:
+                record.amount_due = frozen[record._origin.id]
+                continue
+
             if not record.unit_id:
                 record.amount_due = 0.0
                 continue
@@ -165,12 +156,19 @@ class UnitUtilityTransaction(models.Model):
             else:
                 record.billing_type = 'Flat Rate'
 
+    @api.model
+    def _get_reading_errors(self, previous_reading, current_reading):
+        """Return the _check_readings errors for a pair of meter readings"""
+        if previous_reading and current_reading and current_reading < previous_reading:
+            return ["Current reading cannot be less than previous reading!"]
+        return []
+
     @api.constrains('previous_reading', 'current_reading')
     def _check_readings(self):
         for record in self:
-            if record.previous_reading and record.current_reading:
-                if record.current_reading < record.previous_reading:
-                    raise ValidationError("Current reading cannot be less than previous reading!")
+            errors = self._get_reading_errors(record.previous_reading, record.current_reading)
+            if errors:
+                raise ValidationError(errors[0])
 
     @api.constrains('amount_paid')
     def _check_amount(self):
@@ -254,6 +252,13 @@ class UnitUtilityTransaction(models.Model):
             }
         }
 
+    def action_generate_soa(self):
+        """Generate the Statement of Account of the units of these transactions"""
+        if not any(self.mapped('soa_issuable')):
+            raise ValidationError("SOA cannot be generated: this transaction is not underpaid.")
+        documents, _rendered, _reused = self._soa_generate([('unit_id', 'in', self.unit_id.ids)])
+        return self._soa_open(documents)
+
     def name_get(self):
         result = []
         for record in self:
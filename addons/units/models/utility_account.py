@@ -22,19 +22,35 @@ class UtilityAccountUnits(models.Model):
     unit_utility_bill_count = fields.Integer('Unit Utility Bill Count', 
                                              compute='_compute_unit_utility_bill_count', store=False)
     
-    @api.depends('electricity_unit_ids', 'water_unit_ids')
+    # utility_type -> unit field linking the unit to its utility account
+    _unit_account_fields = {
+        'electricity': 'electricity_utility_account_id',
+        'water': 'water_utility_account_id',
+    }
+
+    def _get_unit_counts(self, domain=None):
+        """Map account id to its number of units matching ``domain`` (one grouped count per utility type)"""
+        counts = {}
+        for utility_type, fname in self._unit_account_fields.items():
+            accounts = self._origin.filtered(lambda a: a.utility_type == utility_type)
+            if accounts:
+                groups = self.env['kst.unit'].read_group(
+                    [(fname, 'in', accounts.ids)] + (domain or []), [fname], [fname])
+                counts.update({group[fname][0]: group[f'{fname}_count'] for group in groups})
+        return counts
+
+    @api.depends('utility_type', 'electricity_unit_ids', 'water_unit_ids')
     def _compute_unit_count(self):
+        counts = self._get_unit_counts()
         for record in self:
-            # Count units based on utility type
-            if record.utility_type == 'electricity':
-                record.unit_count = len(record.electricity_unit_ids)
-            elif record.utility_type == 'water':
-                record.unit_count = len(record.water_unit_ids)
-            else:
-                record.unit_count = 0
+            record.unit_count = counts.get(record._origin.id, 0)
     
     @api.depends('unit_utility_bill_ids')
     def _compute_unit_utility_bill_count(self):
+        counts = {}
+        if self._origin:
+            groups = self.env['kst.unit.utility.bill'].read_group(
+                [('utility_account_id', 'in', self._origin.ids)], ['utility_account_id'], ['utility_account_id'])
+            counts = {group['utility_account_id'][0]: group['utility_account_id_count'] for group in groups}
         for record in self:
-            record.unit_utility_bill_count = len(record.unit_utility_bill_ids)
-
+            record.unit_utility_bill_count = counts.get(record._origin.id, 0)